@@ -0,0 +1,38 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+SIZES = {'10k': 10_000, '1M': 1_000_000, '10M': 10_000_000}
+NULL_RATIO = 0.6
+
+
+def synthetic_frame(rows, width=2, cardinality=50, seed=0):
+    # Every group has `width` columns: numeric, categorical, datetime and null-heavy ones of each kind.
+    rng = np.random.default_rng(seed)
+    categories = np.array([f"category_{index}" for index in range(cardinality)], dtype=object)
+    start = np.datetime64('2015-01-01T00:00:00').astype('int64')
+    columns = {}
+    for index in range(width):
+        columns[f"float_{index}"] = rng.normal(100, 25, rows)
+        columns[f"int_{index}"] = rng.integers(0, 1000, rows)
+        columns[f"category_{index}"] = categories[rng.integers(0, cardinality, rows)]
+        columns[f"date_{index}"] = pd.to_datetime(start + rng.integers(0, 10 * 365 * 86400, rows), unit='s')
+
+        nulls = rng.random(rows) < NULL_RATIO
+        sparse_float = rng.normal(0, 1, rows)
+        sparse_float[nulls] = np.nan
+        columns[f"sparse_float_{index}"] = sparse_float
+        sparse_category = categories[rng.integers(0, cardinality, rows)]
+        sparse_category[nulls] = None
+        columns[f"sparse_category_{index}"] = sparse_category
+        columns[f"sparse_date_{index}"] = columns[f"date_{index}"].where(~nulls)
+    return pd.DataFrame(columns)
+
+
+def synthetic_csv(df):
+    buffer = io.BytesIO()
+    # Day-first dates are not inferred by the pyarrow reader, so the datetime detection still has work to do.
+    df.to_csv(buffer, index=False, date_format='%d.%m.%Y %H:%M')
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,153 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+from streamlit.logger import set_log_level
+
+from benchmarks.datasets import SIZES, synthetic_csv, synthetic_frame
+from core.bivariate import association_statistics
+from core.datetimes import detect_datetime_columns
+from core.dtypes import CATEGORICAL_DTYPES, DATETIME_DTYPES, NUMERICAL_DTYPES
+from core.edit_history import replace_empty_values
+from core.imputation import REPLACE_EMPTY_STRATEGIES
+from core.ingestion import parse_csv, parse_csv_chunked
+from core.missing import MissingProfile
+from core.profiling import get_missing_values, statistics_table
+from side_pages.statistics_1d import generate_1d_plots
+from side_pages.statistics_2d import generate_2d_plots
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+CUSTOM_VALUES = {'numeric': 0, 'categorical': 'missing', 'datetime': pd.Timestamp('2000-01-01')}
+
+
+def custom_value(dtype):
+    if dtype in NUMERICAL_DTYPES:
+        return CUSTOM_VALUES['numeric']
+    if dtype in DATETIME_DTYPES:
+        return CUSTOM_VALUES['datetime']
+    return CUSTOM_VALUES['categorical']
+
+
+def benchmark_cases(df, csv):
+    # Each case runs the uncached compute path of one page; no dataset version is passed.
+    parsed, _ = parse_csv(csv, ',', '.')
+    sparse = [column for column in df.columns if column.startswith('sparse_')]
+    numerical = df.select_dtypes(include=NUMERICAL_DTYPES).columns.tolist()
+    categorical = df.select_dtypes(include=CATEGORICAL_DTYPES).columns.tolist()
+    datetimes = df.select_dtypes(include=DATETIME_DTYPES).columns.tolist()
+
+    cases = {
+        'loading/parse_csv': lambda: parse_csv(csv, ',', '.'),
+        'loading/detect_datetime_columns': lambda: detect_datetime_columns(parsed.copy(deep=False)),
+        'loading/parse_csv_chunked': lambda: parse_csv_chunked(csv, ',', '.'),
+        'manipulation/get_missing_values': lambda: get_missing_values(df),
+        'manipulation/missing_profile': lambda: MissingProfile.from_frame(df),
+        'manipulation/missing_profile/co_missingness': lambda: MissingProfile.from_frame(df).co_missingness(),
+        'manipulation/missing_profile/row_patterns': lambda: MissingProfile.from_frame(df).row_patterns(),
+    }
+    for column in sparse:
+        dtype = df.dtypes[column]
+        for method in REPLACE_EMPTY_STRATEGIES[str(dtype)]:
+            cases[f"manipulation/replace_empty_values/{column}/{method}"] = \
+                lambda column=column, method=method, dtype=dtype: replace_empty_values(df, column, method,
+                                                                                       custom_value(dtype))
+    cases.update({
+        'statistics_1d/statistics_table': lambda: statistics_table(df, df.columns.tolist()),
+        'statistics_1d/generate_1d_plots': lambda: generate_1d_plots(df, df.columns.tolist()),
+        'statistics_1d/statistics_table/approximate': lambda: statistics_table(df, df.columns.tolist(),
+                                                                                approximate=True),
+        'statistics_1d/generate_1d_plots/approximate': lambda: generate_1d_plots(df, df.columns.tolist(),
+                                                                                 approximate=True),
+        'statistics_2d/association_statistics': lambda: association_statistics(df, numerical + categorical),
+        'statistics_2d/plots/numerical_numerical': lambda: generate_2d_plots(df, numerical[:2]),
+        'statistics_2d/plots/categorical_numerical': lambda: generate_2d_plots(df, [categorical[0], numerical[0]]),
+        'statistics_2d/plots/categorical_categorical': lambda: generate_2d_plots(df, categorical[:2]),
+        'statistics_2d/plots/datetime_numerical': lambda: generate_2d_plots(df, [datetimes[0], numerical[0]]),
+    })
+    return cases
+
+
+def measure(function, repeat):
+    # Wall time is the best of `repeat` runs without tracing; peak memory comes from one traced run.
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(times), 'peak_bytes': peak}
+
+
+def run(sizes, width, cardinality, repeat, selected=None):
+    results = {}
+    for size in sizes:
+        df = synthetic_frame(SIZES[size], width, cardinality)
+        csv = synthetic_csv(df)
+        for name, function in benchmark_cases(df, csv).items():
+            if selected and not any(pattern in name for pattern in selected):
+                continue
+            key = f"{size}/{name}"
+            results[key] = measure(function, repeat)
+            print(f"{key:<90} {results[key]['seconds']:>9.3f}s {results[key]['peak_bytes'] / 2 ** 20:>10.1f} MB",
+                  flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if previous[metric] and result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{key}: {metric} {previous[metric]:.4g} -> {result[metric]:.4g} "
+                                   f"(+{result[metric] / previous[metric] - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the compute paths of every page on synthetic data.")
+    parser.add_argument('--sizes', default='10k', help=f"comma separated, from {', '.join(SIZES)}")
+    parser.add_argument('--width', type=int, default=2, help="columns of each kind")
+    parser.add_argument('--cardinality', type=int, default=50, help="distinct values of categorical columns")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', action='append', help="only run cases whose name contains this text")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--update-baseline', action='store_true', help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    # Page functions draw into a bare Streamlit runtime, which would otherwise warn on every element.
+    set_log_level('error')
+    results = run(args.sizes.split(','), args.width, args.cardinality, args.repeat, args.filter)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({'python': platform.python_version(), 'pandas': pd.__version__,
+                       'machine': platform.machine(), 'results': {**baseline, **results}}, file, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
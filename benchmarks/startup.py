@@ -0,0 +1,45 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_MODULES = ['streamlit', 'st_pages', 'utils']
+PAGE_MODULES = ['side_pages.data_loading', 'side_pages.data_manipulation', 'side_pages.statistics_1d',
+                'side_pages.statistics_2d']
+# What a new process imports before the first page renders: every page up front, or only the loading page.
+STARTUP_MODES = {
+    'eager': APP_MODULES + PAGE_MODULES,
+    'lazy': APP_MODULES + PAGE_MODULES[:1],
+}
+
+
+def import_seconds(modules):
+    # A fresh interpreter per run, so only the OS file cache is warm.
+    code = ("import time; start = time.perf_counter()\n"
+            + "".join(f"import {module}\n" for module in modules)
+            + "print(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True,
+                            env={**os.environ, 'PYTHONPATH': ROOT})
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the imports a new app process does before its first page.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = {mode: min(import_seconds(modules) for _ in range(args.repeat))
+               for mode, modules in STARTUP_MODES.items()}
+    for mode, seconds in results.items():
+        print(f"{mode:<10} {seconds:>9.3f}s")
+    print(f"{'saved':<10} {results['eager'] - results['lazy']:>9.3f}s")
+    for module in PAGE_MODULES[1:]:
+        # Each later page's own import cost, which the warm-up thread moves off the first switch to it.
+        seconds = min(import_seconds(STARTUP_MODES['lazy'] + [module]) for _ in range(args.repeat)) - results['lazy']
+        print(f"{module:<40} +{seconds:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
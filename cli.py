@@ -0,0 +1,97 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.backends import ARROW_BACKEND_MIN_BYTES, ArrowBackend
+from core.datetimes import detect_datetime_columns
+from core.ingestion import PARSER_ENGINE, parse_csv, stream_csv_to_feather
+from core.report import profile_dataset, report_html, report_json
+
+REPORT_FORMATS = {'json': report_json, 'html': report_html}
+
+
+def load_file(path, scratch, sep, decimal, arrow_min_bytes):
+    # Large files are streamed into an Arrow file and profiled from it without building a DataFrame.
+    if PARSER_ENGINE == 'pyarrow' and os.path.getsize(path) >= arrow_min_bytes:
+        try:
+            stream_csv_to_feather(path, scratch, sep, decimal)
+            return ArrowBackend(scratch), 'pyarrow'
+        except ValueError:
+            pass
+    with open(path, 'rb') as source:
+        df, engine = parse_csv(source, sep, decimal)
+    return detect_datetime_columns(df), engine
+
+
+def profile_file(path, output, sep=',', decimal='.', formats=('json', 'html'), arrow_min_bytes=ARROW_BACKEND_MIN_BYTES):
+    start = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    scratch = os.path.join(output, f".{stem}.{os.getpid()}.arrow")
+    try:
+        df, engine = load_file(path, scratch, sep, decimal, arrow_min_bytes)
+        report = profile_dataset(df, os.path.basename(path))
+    finally:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+
+    outputs = []
+    for report_format in formats:
+        target = os.path.join(output, f"{stem}.{report_format}")
+        with open(target, 'w', encoding='utf-8') as file:
+            file.write(REPORT_FORMATS[report_format](report))
+        outputs.append(target)
+    return {'file': path, 'rows': report['rows'], 'columns': report['columns'], 'engine': engine,
+            'backend': report['backend'],
+            'seconds': time.perf_counter() - start, 'outputs': outputs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile every CSV file in a directory without the web app.")
+    parser.add_argument('directory')
+    parser.add_argument('--output', default='reports', help="directory for the reports")
+    parser.add_argument('--pattern', default='*.csv')
+    parser.add_argument('--sep', default=',')
+    parser.add_argument('--decimal', default='.')
+    parser.add_argument('--format', default='json,html', help="comma separated, from json and html")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processes profiling files")
+    parser.add_argument('--arrow-min-bytes', type=int, default=ARROW_BACKEND_MIN_BYTES,
+                        help="files at least this large are profiled out of core with the Arrow backend")
+    args = parser.parse_args(argv)
+
+    formats = args.format.split(',')
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        parser.error(f"unknown report format: {', '.join(sorted(unknown))}")
+    paths = sorted(glob.glob(os.path.join(args.directory, args.pattern)))
+    if not paths:
+        parser.error(f"no files match {args.pattern} in {args.directory}")
+    os.makedirs(args.output, exist_ok=True)
+
+    # Files are independent, so each one is parsed and profiled in its own process.
+    summary = []
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(paths))) as executor:
+        futures = {executor.submit(profile_file, path, args.output, args.sep, args.decimal, formats,
+                                   args.arrow_min_bytes): path
+                   for path in paths}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                result = future.result()
+                print(f"[{done}/{len(paths)}] {result['file']}: {result['rows']:,} rows in {result['seconds']:.2f}s",
+                      flush=True)
+            except Exception as error:
+                result = {'file': futures[future], 'error': f"{type(error).__name__}: {error}"}
+                print(f"[{done}/{len(paths)}] {result['file']}: failed ({result['error']})", file=sys.stderr,
+                      flush=True)
+            summary.append(result)
+
+    with open(os.path.join(args.output, 'summary.json'), 'w') as file:
+        json.dump(sorted(summary, key=lambda result: result['file']), file, indent=2)
+    return 1 if any('error' in result for result in summary) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2, chi2_contingency, rankdata
+
+from core.cache import LRUCache
+from core.jobs import collect_results
+
+ASSOCIATION_WORKERS = min(8, os.cpu_count() or 1)
+FACTORIZED_COLUMNS_BYTES = int(os.environ.get('EDA_FACTORIZED_COLUMNS_BYTES', 512 * 2 ** 20))
+RANKED_COLUMNS_BYTES = int(os.environ.get('EDA_RANKED_COLUMNS_BYTES', 512 * 2 ** 20))
+
+# Entries are full per-row code and rank arrays, so both caches are bounded by bytes rather than by column count.
+factorized_columns = LRUCache(max_entries=128, max_bytes=FACTORIZED_COLUMNS_BYTES,
+                              sizeof=lambda entry: entry[0].nbytes)
+ranked_columns = LRUCache(max_entries=128, max_bytes=RANKED_COLUMNS_BYTES, sizeof=lambda entry: entry[0].nbytes)
+pair_results = LRUCache(max_entries=4096)
+
+
+def cached(cache, key, version, compute):
+    if version is None:
+        return compute()
+    return cache.get_or_compute((version, *key), compute)[0]
+
+
+def factorize_column(df, column, version=None):
+    def compute():
+        codes, categories = pd.factorize(df[column])
+        return codes, len(categories)
+
+    return cached(factorized_columns, (column,), version, compute)
+
+
+def contingency_counts(codes1, codes2, k2):
+    # Only the combinations that occur are counted, so memory follows the observed pairs instead of k1 * k2.
+    valid = (codes1 >= 0) & (codes2 >= 0)
+    combined, counts = np.unique(codes1[valid].astype('int64') * k2 + codes2[valid], return_counts=True)
+    rows, row_index = np.unique(combined // k2, return_inverse=True)
+    columns, column_index = np.unique(combined % k2, return_inverse=True)
+    return row_index, column_index, counts, (len(rows), len(columns))
+
+
+def contingency_table(codes1, k1, codes2, k2):
+    rows, columns, counts, shape = contingency_counts(codes1, codes2, k2)
+    table = np.zeros(shape, dtype='int64')
+    table[rows, columns] = counts
+    return table
+
+
+def chi_square_statistic(rows, columns, counts, shape):
+    # Pearson's statistic over the observed cells only: sum (O - E)^2 / E equals N * (sum O^2 / (R_i * C_j) - 1).
+    total = counts.sum()
+    row_totals = np.bincount(rows, weights=counts, minlength=shape[0])
+    column_totals = np.bincount(columns, weights=counts, minlength=shape[1])
+    statistic = total * (np.sum(counts.astype('float64') ** 2 / (row_totals[rows] * column_totals[columns])) - 1)
+    dof = (shape[0] - 1) * (shape[1] - 1)
+    return max(statistic, 0.0), chi2.sf(statistic, dof), dof
+
+
+def chi_square_test(df, var1, var2, version=None):
+    def compute():
+        (codes1, k1), (codes2, k2) = factorize_column(df, var1, version), factorize_column(df, var2, version)
+        rows, columns, counts, shape = contingency_counts(codes1, codes2, k2)
+        if counts.size == 0:
+            chi2_statistic, p, dof, cramers_v = np.nan, np.nan, 0, np.nan
+        else:
+            if min(shape) == 1:
+                chi2_statistic, p, dof = 0.0, 1.0, 0
+            elif shape == (2, 2):
+                # 2x2 tables get the Yates continuity correction, as chi2_contingency applies it.
+                chi2_statistic, p, dof, _ = chi2_contingency(contingency_table(codes1, k1, codes2, k2))
+            else:
+                chi2_statistic, p, dof = chi_square_statistic(rows, columns, counts, shape)
+            smaller_side = min(shape) - 1
+            cramers_v = np.sqrt(chi2_statistic / (counts.sum() * smaller_side)) if smaller_side > 0 else np.nan
+        return {
+            'Variable 1': var1,
+            'Variable 2': var2,
+            'Chi-Square Statistic': chi2_statistic,
+            'p-value': p,
+            'Degrees of Freedom': dof,
+            "Cramér's V": cramers_v,
+        }
+
+    return cached(pair_results, ('chi2', var1, var2), version, compute)
+
+
+def pairwise_chi_square(df, columns, version=None, workers=ASSOCIATION_WORKERS, progress=None):
+    pairs = list(combinations(columns, 2))
+    for column in columns:
+        factorize_column(df, column, version)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(chi_square_test, df, var1, var2, version): (var1, var2) for var1, var2 in pairs}
+        results = collect_results(executor, futures, progress)
+    return pd.DataFrame([results[pair] for pair in pairs])
+
+
+def rank_values(values):
+    ranks = np.full(len(values), np.nan)
+    valid = ~np.isnan(values)
+    ranks[valid] = rankdata(values[valid])
+    _, tie_counts = np.unique(values[valid], return_counts=True)
+    tie_counts = tie_counts.astype('float64')
+    return ranks, (tie_counts ** 3 - tie_counts).sum()
+
+
+def rank_column(df, column, version=None):
+    return cached(ranked_columns, (column,), version,
+                  lambda: rank_values(df[column].to_numpy(dtype='float64', na_value=np.nan)))
+
+
+def kruskal_test(df, numerical, categorical, version=None):
+    def compute():
+        ranks, ties = rank_column(df, numerical, version)
+        codes, k = factorize_column(df, categorical, version)
+        valid = ~np.isnan(ranks)
+        if (valid & (codes < 0)).any():
+            # Rows without a category leave the test, so the remaining values are ranked again.
+            valid &= codes >= 0
+            values = df[numerical].to_numpy(dtype='float64', na_value=np.nan)
+            subset_ranks, ties = rank_values(values[valid])
+            ranks = np.full(len(values), np.nan)
+            ranks[valid] = subset_ranks
+        # Group rank sums come from one weighted bincount instead of per-group Python lists.
+        sizes = np.bincount(codes[valid], minlength=k)
+        rank_sums = np.bincount(codes[valid], weights=ranks[valid], minlength=k)
+        nonempty = sizes > 0
+        groups = int(nonempty.sum())
+        total = float(sizes.sum())
+        correction = 1 - ties / (total ** 3 - total) if total > 1 else 0
+        if groups < 2 or correction <= 0:
+            statistic, p_value = np.nan, np.nan
+        else:
+            statistic = 12 / (total * (total + 1)) * (rank_sums[nonempty] ** 2 / sizes[nonempty]).sum() \
+                - 3 * (total + 1)
+            statistic /= correction
+            p_value = chi2.sf(statistic, groups - 1)
+        return {
+            'Variable 1': numerical,
+            'Variable 2': categorical,
+            'Test Type': 'Kruskal-Wallis',
+            'Statistic': statistic,
+            'p-value': p_value,
+            'Degrees of Freedom': groups - 1,
+        }
+
+    return cached(pair_results, ('kruskal', numerical, categorical), version, compute)
+
+
+def pairwise_kruskal(df, numericals, categoricals, version=None, workers=ASSOCIATION_WORKERS, progress=None):
+    pairs = [(numerical, categorical) for numerical in numericals for categorical in categoricals]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each numeric column is ranked once and each categorical column factorized once, up front.
+        list(executor.map(lambda column: rank_column(df, column, version), numericals))
+        list(executor.map(lambda column: factorize_column(df, column, version), categoricals))
+        futures = {executor.submit(kruskal_test, df, numerical, categorical, version): (numerical, categorical)
+                   for numerical, categorical in pairs}
+        results = collect_results(executor, futures, progress)
+    return pd.DataFrame([results[pair] for pair in pairs])
+
+
+def cramers_v_matrix(results, columns):
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for row in results.itertuples(index=False):
+        matrix.loc[row[0], row[1]] = matrix.loc[row[1], row[0]] = row[-1]
+    return matrix
@@ -0,0 +1,133 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.cache import LRUCache
+
+ARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+ARROW_BACKEND_MIN_BYTES = int(os.environ.get('EDA_ARROW_BACKEND_BYTES', 2 * 2 ** 30))
+ARROW_CACHED_COLUMNS = 8
+
+if ARROW_AVAILABLE:
+    import pyarrow as pa
+
+
+class Backend:
+    # Statistics, missing-value and aggregate functions only read whole columns through backend[column],
+    # plus the columns, dtypes and row count, so any backend providing these can run them.
+    name = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __getitem__(self, column):
+        raise NotImplementedError
+
+    @property
+    def columns(self):
+        return self.dtypes.index
+
+    @property
+    def dtypes(self):
+        raise NotImplementedError
+
+    @property
+    def nbytes(self):
+        raise NotImplementedError
+
+    def null_counts(self):
+        raise NotImplementedError
+
+    def frame(self, columns):
+        # A DataFrame holding at least the given columns, for code that needs more than one column at once.
+        return pd.DataFrame({column: self[column] for column in columns})
+
+    def take(self, rows):
+        # All columns of the rows at the given positions, or in the given slice, indexed by position.
+        raise NotImplementedError
+
+
+class PandasBackend(Backend):
+    name = 'pandas'
+
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, column):
+        return self.df[column]
+
+    @property
+    def dtypes(self):
+        return self.df.dtypes
+
+    @property
+    def nbytes(self):
+        return int(self.df.memory_usage(deep=False).sum())
+
+    def null_counts(self):
+        return self.df.isnull().sum()
+
+    def frame(self, columns):
+        return self.df
+
+    def take(self, rows):
+        return self.df.iloc[rows]
+
+
+class ArrowBackend(Backend):
+    name = 'arrow'
+
+    def __init__(self, path):
+        # The file is memory-mapped: only the columns that are read get paged in, one column at a time.
+        self.path = path
+        self._table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        self._dtypes = self._table.schema.empty_table().to_pandas().dtypes
+        self._columns = LRUCache(max_entries=ARROW_CACHED_COLUMNS)
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __getitem__(self, column):
+        def read():
+            return self._table.select([column]).to_pandas(split_blocks=True)[column]
+
+        return self._columns.get_or_compute(column, read)[0]
+
+    @property
+    def dtypes(self):
+        return self._dtypes
+
+    @property
+    def nbytes(self):
+        return self._table.nbytes
+
+    def take(self, rows):
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(len(self))
+            positions = np.arange(start, stop)
+            table = self._table.slice(start, len(positions))
+        else:
+            positions = np.asarray(rows)
+            table = self._table.take(pa.array(positions))
+        df = table.to_pandas()
+        df.index = positions
+        return df
+
+    def null_counts(self):
+        # Arrow keeps a null count per column, so no values have to be read.
+        return pd.Series({name: self._table.column(name).null_count for name in self._table.column_names},
+                         dtype='int64')
+
+
+def as_backend(data):
+    return data if isinstance(data, Backend) else PandasBackend(data)
+
+
+def use_arrow_backend(path, min_bytes=ARROW_BACKEND_MIN_BYTES):
+    # Large datasets with an on-disk Arrow copy are read column by column instead of as a whole frame.
+    return ARROW_AVAILABLE and path is not None and os.path.exists(path) and os.path.getsize(path) >= min_bytes
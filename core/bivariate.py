@@ -0,0 +1,39 @@
+from core.association import pairwise_chi_square, pairwise_kruskal
+from core.correlation import correlation_matrix
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES
+
+
+def split_variables(df, columns):
+    categorical = []
+    numerical = []
+    for column in columns:
+        if df[column].dtype in CATEGORICAL_DTYPES:
+            categorical.append(column)
+        elif df[column].dtype in NUMERICAL_DTYPES:
+            numerical.append(column)
+    return numerical, categorical
+
+
+def association_statistics(df, columns, version=None, method='pearson', progress=None):
+    numerical, categorical = split_variables(df, columns)
+    phases = []
+    if len(numerical) > 1:
+        phases.append(('correlation', "Correlation matrix",
+                       lambda report: correlation_matrix(df, numerical, method, version, progress=report)))
+    if len(categorical) > 1:
+        phases.append(('chi_square', "Chi-square tests",
+                       lambda report: pairwise_chi_square(df, categorical, version, progress=report)))
+    if len(categorical) > 1 and len(numerical) > 0:
+        phases.append(('kruskal', "Kruskal-Wallis tests",
+                       lambda report: pairwise_kruskal(df, numerical, categorical, version, progress=report)))
+
+    results = {}
+    for index, (name, message, compute) in enumerate(phases):
+        def report(done, total, index=index, message=message):
+            # Each phase takes an equal share of the progress bar.
+            if progress is not None:
+                progress(index + (done / total if total else 1), len(phases), message)
+
+        report(0, 1)
+        results[name] = compute(report)
+    return results
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.cache import LRUCache
+from core.datetimes import infer_datetime_format
+from core.dtypes import NUMERICAL_DTYPES, DATETIME_DTYPES, dtype_option
+from core.store import dataset_store
+
+CONVERSION_WORKERS = min(8, os.cpu_count() or 1)
+
+conversion_reports = LRUCache(max_entries=64)
+
+
+def build_conversion_plan(dtypes, choices):
+    return {col: choice for col, choice in choices.items() if choice != dtype_option(dtypes[col])}
+
+
+def plan_key(dataset_hash, plan):
+    digest = hashlib.blake2b(repr(sorted(plan.items())).encode(), digest_size=8).hexdigest()
+    return f"{dataset_hash}|{digest}" if plan else dataset_hash
+
+
+def convert_numeric(series, target):
+    converted = series if series.dtype in NUMERICAL_DTYPES else pd.to_numeric(series, errors='coerce')
+    failed = int(converted.isna().sum() - series.isna().sum())
+    if target.startswith('int'):
+        if converted.isna().any():
+            return converted, failed, f"missing values cannot be stored as {target}, kept as {converted.dtype}"
+        limits = np.iinfo(target)
+        if converted.min() < limits.min or converted.max() > limits.max:
+            return converted, failed, f"values out of range for {target}, kept as {converted.dtype}"
+    return converted.astype(target), failed, None
+
+
+def convert_column(series, target):
+    if target in NUMERICAL_DTYPES:
+        return convert_numeric(series, target)
+    if target in DATETIME_DTYPES:
+        date_format = infer_datetime_format(series) if series.dtype == 'object' else None
+        converted = pd.to_datetime(series, format=date_format, errors='coerce').astype(target)
+        return converted, int(converted.isna().sum() - series.isna().sum()), None
+    return series.astype(target), 0, None
+
+
+def safe_convert_column(series, target):
+    try:
+        return convert_column(series, target)
+    except (TypeError, ValueError) as error:
+        return series, 0, str(error)
+
+
+def apply_conversion_plan(df, plan, workers=CONVERSION_WORKERS):
+    conversions = {col: target for col, target in plan.items() if target != 'Delete'}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(conversions, executor.map(safe_convert_column,
+                                                     (df[col] for col in conversions), conversions.values())))
+
+    # Unconverted columns are shared with the source frame rather than copied.
+    columns = {}
+    report = []
+    for col in df.columns:
+        if plan.get(col) == 'Delete':
+            continue
+        if col not in results:
+            columns[col] = df[col]
+            continue
+        converted, failed, error = results[col]
+        columns[col] = converted
+        report.append({
+            'Column Name': col,
+            'From': str(df.dtypes[col]),
+            'To': str(converted.dtype),
+            'Failed Values': failed,
+            'Error': error,
+        })
+    return pd.DataFrame(columns, copy=False), pd.DataFrame(report)
+
+
+def convert_dataset(df, dataset_hash, plan):
+    if not plan:
+        # Nothing to convert, so a dataset read from disk column by column is not loaded here either.
+        return df, pd.DataFrame(), dataset_hash
+    key = plan_key(dataset_hash, plan)
+    report = conversion_reports.get(key)
+    handle = dataset_store.handle(key)
+    if report is None or handle is None:
+        new_df, report = apply_conversion_plan(df, plan)
+        handle = dataset_store.put(key, new_df)
+        conversion_reports.put(key, report)
+    return handle.df, report, key
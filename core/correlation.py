@@ -0,0 +1,125 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+
+from core.association import rank_column
+from core.cache import LRUCache
+from core.jobs import collect_results
+
+CORRELATION_METHODS = ['pearson', 'spearman', 'kendall']
+BLOCK_ROWS = 65_536
+CORRELATION_WORKERS = min(8, os.cpu_count() or 1)
+
+correlation_matrices = LRUCache(max_entries=16)
+
+
+def column_reader(df, columns, method, version=None):
+    if method == 'spearman':
+        # Ranks are computed once per column and shared with the Kruskal-Wallis engine. With missing values
+        # this differs slightly from re-ranking every pair's complete rows, as pandas does.
+        ranks = [rank_column(df, column, version)[0] for column in columns]
+        return [lambda start, stop, values=values: values[start:stop] for values in ranks]
+    return [lambda start, stop, column=column: df[column].iloc[start:stop].to_numpy(dtype='float64', na_value=np.nan)
+            for column in columns]
+
+
+def row_blocks(df, columns, method, version=None, block_rows=BLOCK_ROWS):
+    # Columns are read one row block at a time, so the float32 working set stays at block_rows x columns.
+    readers = column_reader(df, columns, method, version)
+    means = [np.nanmean(reader(0, len(df))) if len(df) else 0.0 for reader in readers]
+    for start in range(0, len(df), block_rows):
+        stop = min(start + block_rows, len(df))
+        block = np.empty((stop - start, len(columns)), dtype='float32')
+        for index, (reader, mean) in enumerate(zip(readers, means)):
+            block[:, index] = reader(start, stop) - mean
+        yield block
+
+
+def reporting(blocks, total, progress=None):
+    for done, block in enumerate(blocks):
+        if progress is not None:
+            progress(done, total)
+        yield block
+
+
+def pairwise_pearson(blocks_a, blocks_b, shape):
+    # Pairwise-complete sums are accumulated from float32 matrix products over row blocks.
+    count, sum_a, sum_b, sum_aa, sum_bb, sum_ab = (np.zeros(shape) for _ in range(6))
+    for block_a, block_b in zip(blocks_a, blocks_b):
+        mask_a = (~np.isnan(block_a)).astype('float32')
+        mask_b = (~np.isnan(block_b)).astype('float32')
+        block_a = np.nan_to_num(block_a)
+        block_b = np.nan_to_num(block_b)
+        count += mask_a.T @ mask_b
+        sum_a += block_a.T @ mask_b
+        sum_b += mask_a.T @ block_b
+        sum_aa += (block_a * block_a).T @ mask_b
+        sum_bb += mask_a.T @ (block_b * block_b)
+        sum_ab += block_a.T @ block_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sum_ab - sum_a * sum_b / count
+        variance_a = sum_aa - sum_a ** 2 / count
+        variance_b = sum_bb - sum_b ** 2 / count
+        correlation = covariance / np.sqrt(variance_a * variance_b)
+    correlation[count < 2] = np.nan
+    return np.clip(correlation, -1, 1)
+
+
+def kendall_pair(x, y):
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if valid.sum() < 2:
+        return np.nan
+    return kendalltau(x[valid], y[valid]).statistic
+
+
+def pairwise_kendall(df, rows, columns, workers=CORRELATION_WORKERS, progress=None):
+    arrays = {column: df[column].to_numpy(dtype='float64', na_value=np.nan) for column in set(rows) | set(columns)}
+    pairs = [(row, column) for row in rows for column in columns]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(lambda pair: 1.0 if pair[0] == pair[1] else
+                                   kendall_pair(arrays[pair[0]], arrays[pair[1]]), pair): pair for pair in pairs}
+        results = collect_results(executor, futures, progress)
+    return np.array([results[pair] for pair in pairs]).reshape(len(rows), len(columns))
+
+
+def correlation_block(df, rows, columns, method, version=None, progress=None):
+    if method == 'kendall':
+        values = pairwise_kendall(df, rows, columns, progress=progress)
+    else:
+        blocks = -(-len(df) // BLOCK_ROWS)
+        values = pairwise_pearson(reporting(row_blocks(df, rows, method, version), blocks, progress),
+                                  row_blocks(df, columns, method, version), (len(rows), len(columns)))
+    return pd.DataFrame(values, index=rows, columns=columns)
+
+
+def correlation_matrix(df, columns, method='pearson', version=None, progress=None):
+    if version is None:
+        return correlation_block(df, columns, columns, method, progress=progress)
+
+    # The cached matrix only grows: newly selected columns are correlated against everything known so far.
+    key = (version, method)
+    matrix = correlation_matrices.get(key)
+    known = [] if matrix is None else matrix.index.tolist()
+    missing = [column for column in columns if column not in known]
+    if missing:
+        all_columns = known + missing
+        block = correlation_block(df, missing, all_columns, method, version, progress)
+        grown = pd.DataFrame(np.nan, index=all_columns, columns=all_columns)
+        if known:
+            grown.loc[known, known] = matrix
+        grown.loc[missing, :] = block
+        grown.loc[:, missing] = block.T
+        matrix = grown
+        correlation_matrices.put(key, matrix)
+    return matrix.loc[columns, columns]
+
+
+def strongest_pairs(matrix, k=20):
+    upper = np.triu(np.ones(matrix.shape, dtype=bool), k=1)
+    pairs = matrix.where(upper).stack().rename('Correlation').reset_index()
+    pairs.columns = ['Variable 1', 'Variable 2', 'Correlation']
+    pairs = pairs.assign(strength=pairs['Correlation'].abs()).nlargest(k, 'strength')
+    return pairs.drop(columns='strength').reset_index(drop=True)
@@ -0,0 +1,90 @@
+import re
+import warnings
+
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from core.cache import LRUCache
+
+DATE_PATTERN = re.compile(r'((\d{4})[-,\.](\d{2})[-,\.](\d{2})( (\d{2}):(\d{2}):(\d{2}))?)|'
+                          r'((\d{2})[-,\.](\d{2})[-,\.](\d{4})( (\d{2}):(\d{2})(:(\d{02}))?)?)')
+DATE_SAMPLE_SIZE = 200
+MAX_FAILED_RATIO = 0.01
+
+# Only the inferred formats are kept; the parsed columns themselves live in the dataset store.
+datetime_formats = LRUCache(max_entries=1024)
+
+
+def sample_strings(series, size=DATE_SAMPLE_SIZE):
+    values = series.dropna()
+    if len(values) > size:
+        values = values.sample(size, random_state=0)
+    if values.empty or not values.map(lambda value: isinstance(value, str)).all():
+        return None
+    return values
+
+
+def infer_datetime_format(series):
+    sample = sample_strings(series)
+    if sample is None:
+        return None
+    sample = sample.str.strip()
+    if not sample.str.match(DATE_PATTERN).all():
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        guesses = pd.concat([sample.map(lambda value: guess_datetime_format(value, dayfirst=False)),
+                             sample.map(lambda value: guess_datetime_format(value, dayfirst=True))])
+    counts = guesses.dropna().value_counts()
+    # Ambiguous dates resolve to year-month-day or day-month-year, the two layouts DATE_PATTERN describes.
+    for date_format in sorted(counts.index, key=lambda fmt: (field_order_rank(fmt), -counts[fmt])):
+        if pd.to_datetime(sample, format=date_format, errors='coerce').notna().all():
+            return date_format
+    return None
+
+
+def field_order_rank(date_format):
+    year, month, day = (date_format.find(field) for field in ('%Y', '%m', '%d'))
+    return 0 if year < month < day or day < month < year else 1
+
+
+def parse_datetime(series, date_format):
+    parsed = pd.to_datetime(series, format=date_format, errors='coerce')
+    failed = parsed.isna().sum() - series.isna().sum()
+    if failed > MAX_FAILED_RATIO * series.count():
+        parsed = pd.to_datetime(series.str.strip(), format=date_format, errors='coerce')
+        failed = parsed.isna().sum() - series.isna().sum()
+    if failed > MAX_FAILED_RATIO * series.count():
+        return None
+    return parsed.astype('datetime64[ns]')
+
+
+def failed_count(series, parsed):
+    # Values that were present in the text column but did not parse with the format.
+    return int(series.count() - parsed.count())
+
+
+def detect_datetime_column(series, dataset_hash=None):
+    if dataset_hash is None:
+        date_format = infer_datetime_format(series)
+    else:
+        date_format = datetime_formats.get_or_compute((dataset_hash, series.name),
+                                                      lambda: infer_datetime_format(series))[0]
+    if date_format is None:
+        return None, None
+    return date_format, parse_datetime(series, date_format)
+
+
+def detect_datetime_columns(df, dataset_hash=None, failures=None):
+    # Up to MAX_FAILED_RATIO of a column may fail to parse and become NaT; those counts go into `failures`.
+    for col in df.columns:
+        if df.dtypes[col] != 'object':
+            continue
+        _, parsed = detect_datetime_column(df[col], dataset_hash)
+        if parsed is not None:
+            failed = failed_count(df[col], parsed)
+            if failures is not None and failed:
+                failures[col] = failed
+            df[col] = parsed
+    return df
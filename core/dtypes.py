@@ -0,0 +1,20 @@
+NUMERICAL_DTYPES = ['int8', 'int16', 'int32', 'int64', 'float32', 'float64']
+CATEGORICAL_DTYPES = ['object', 'category', 'string']
+DATETIME_DTYPES = ['datetime64[ns]']
+
+DTYPE_OPTIONS = NUMERICAL_DTYPES + ['object', 'category', 'string[pyarrow]'] + DATETIME_DTYPES
+
+
+def columns_of_dtypes(dtypes, include):
+    # select_dtypes over a dtypes Series, so no frame has to be loaded to list the columns of each kind.
+    return [column for column, dtype in dtypes.items() if str(dtype) in include]
+
+
+def dtype_option(dtype):
+    name = str(dtype)
+    if name == 'string':
+        return 'string[pyarrow]'
+    if name in DTYPE_OPTIONS:
+        return name
+    return 'object'
+
@@ -0,0 +1,190 @@
+import hashlib
+
+from core.backends import ArrowBackend, PandasBackend, use_arrow_backend
+from core.cache import LRUCache
+from core.imputation import fill_missing, impute_columns
+from core.missing import MissingProfile
+from core.store import dataset_store
+
+MAX_CACHED_VERSIONS = 10
+
+
+def fill_operation(column, method, value=None):
+    if method == "Drop Rows":
+        return {'op': 'drop_rows', 'column': column}
+    return {'op': 'fill', 'column': column, 'method': method, 'value': value}
+
+
+def rename_operation(column, new_name):
+    return {'op': 'rename', 'column': column, 'new_name': new_name}
+
+
+def impute_operation(plan):
+    return {'op': 'impute', 'plan': tuple(sorted(plan.items()))}
+
+
+def describe_operation(operation):
+    if operation['op'] == 'fill':
+        return f"Fill '{operation['column']}' with {operation['method']}"
+    if operation['op'] == 'impute':
+        return f"Fill {len(operation['plan'])} columns: " + ", ".join(f"'{column}' with {method}"
+                                                                   for column, method in operation['plan'])
+    if operation['op'] == 'drop_rows':
+        return f"Drop rows with missing '{operation['column']}'"
+    return f"Rename '{operation['column']}' to '{operation['new_name']}'"
+
+
+def with_column(df, column, series):
+    # A shallow copy shares every other column with the previous version.
+    new_df = df.copy(deep=False)
+    new_df[column] = series
+    return new_df
+
+
+def apply_operation(df, operation):
+    if operation['op'] == 'impute':
+        return impute_columns(df, operation['plan'])
+    column = operation['column']
+    if operation['op'] == 'fill':
+        return with_column(df, column, fill_missing(df[column], operation['method'], operation['value']))
+    if operation['op'] == 'drop_rows':
+        if not df[column].isnull().any():
+            return df
+        return df.dropna(subset=[column])
+    if operation['op'] == 'rename':
+        return df.rename(columns={column: operation['new_name']}, copy=False)
+    raise ValueError(f"Unknown operation: {operation['op']}")
+
+
+def replace_empty_values(df, column, method, custom_value=None):
+    return apply_operation(df, fill_operation(column, method, custom_value))
+
+
+def affected_columns(operation):
+    if operation['op'] == 'fill':
+        return [operation['column']]
+    if operation['op'] == 'impute' and all(method != "Drop Rows" for _, method in operation['plan']):
+        return [column for column, _ in operation['plan']]
+    if operation['op'] == 'rename':
+        return []
+    return None
+
+
+def update_missing_profile(profile, df, operation):
+    columns = affected_columns(operation)
+    if columns is None:
+        return MissingProfile.from_frame(df)
+    if operation['op'] == 'rename':
+        return profile.renamed({operation['column']: operation['new_name']})
+    return profile.with_columns(df, columns)
+
+
+def next_version(version, operation):
+    digest = hashlib.blake2b(f"{version}|{sorted(operation.items())!r}".encode(), digest_size=8).hexdigest()
+    return f"{version.split('@')[0]}@{digest}"
+
+
+class EditHistory:
+    def __init__(self, base_df, base_version, max_cached_versions=MAX_CACHED_VERSIONS):
+        # The base frame is shared through the dataset store; edits build new frames that reuse its columns.
+        self._base = dataset_store.put(base_version, base_df)
+        self.operations = []
+        self.position = 0
+        self._versions = [base_version]
+        self._frames = LRUCache(max_entries=max_cached_versions)
+        self._missing_profiles = LRUCache(max_entries=max_cached_versions)
+        self._arrow_backend = None
+
+    @property
+    def base_df(self):
+        return self._base.df
+
+    @property
+    def version(self):
+        return self._versions[self.position]
+
+    @property
+    def edited(self):
+        return self.position > 0
+
+    @property
+    def current(self):
+        return self.frame_at(self.position)
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.operations)
+
+    def frame_at(self, position):
+        # Replays the log from the closest cached version, or from the base frame when none is cached.
+        start = position
+        df = None
+        while start > 0:
+            df = self._frames.get(self._versions[start])
+            if df is not None:
+                break
+            start -= 1
+        if df is None:
+            df = self.base_df
+        for index in range(start, position):
+            df = apply_operation(df, self.operations[index])
+            self._frames.put(self._versions[index + 1], df)
+        return df
+
+    def backend(self):
+        # Unedited large datasets are read straight from the store's file; edited versions only exist as frames.
+        path = dataset_store.file_path(self._base.key)
+        if not self.edited and path is not None and (dataset_store.streamed(self._base.key) or use_arrow_backend(path)):
+            if self._arrow_backend is None:
+                self._arrow_backend = ArrowBackend(path)
+            return self._arrow_backend
+        return PandasBackend(self.current)
+
+    def null_counts(self):
+        return self.missing_profile().counts
+
+    def missing_profile(self):
+        return self.missing_profile_at(self.position)
+
+    def missing_profile_at(self, position):
+        profile = self._missing_profiles.get(self._versions[position])
+        if profile is not None:
+            return profile
+        df = self.frame_at(position)
+        if position == 0 or self._versions[position - 1] not in self._missing_profiles:
+            profile = MissingProfile.from_frame(df)
+        else:
+            # Only the columns touched by the last operation are scanned again.
+            previous = self._missing_profiles.get(self._versions[position - 1])
+            profile = update_missing_profile(previous, df, self.operations[position - 1])
+        self._missing_profiles.put(self._versions[position], profile)
+        return profile
+
+    def apply(self, operation):
+        df = apply_operation(self.current, operation)
+        del self.operations[self.position:]
+        del self._versions[self.position + 1:]
+        self.operations.append(operation)
+        self._versions.append(next_version(self.version, operation))
+        self.position += 1
+        self._frames.put(self.version, df)
+        return df
+
+    def undo(self):
+        if self.can_undo:
+            self.position -= 1
+
+    def redo(self):
+        if self.can_redo:
+            self.position += 1
+
+    def reset(self):
+        self.operations = []
+        self.position = 0
+        del self._versions[1:]
+        self._frames.clear()
+        self._missing_profiles.clear()
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+EXPORT_DIR = os.environ.get('EDA_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'eda-app-exports'))
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_MAX_FILES = 32
+ARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+if ARROW_AVAILABLE:
+    import pyarrow as pa
+    from pyarrow import feather, parquet
+
+EXPORT_FORMATS = {
+    'CSV': [None, 'gzip', 'zstd'] if ARROW_AVAILABLE else [None, 'gzip'],
+    'Parquet': ['snappy', 'gzip', 'zstd'],
+    'Feather': [None, 'lz4', 'zstd'],
+} if ARROW_AVAILABLE else {'CSV': [None, 'gzip']}
+FILE_EXTENSIONS = {'CSV': 'csv', 'Parquet': 'parquet', 'Feather': 'feather'}
+CSV_COMPRESSION_EXTENSIONS = {'gzip': 'gz', 'zstd': 'zst'}
+MIME_TYPES = {'CSV': 'text/csv', 'Parquet': 'application/vnd.apache.parquet', 'Feather': 'application/octet-stream'}
+
+_export_lock = threading.Lock()
+
+
+def file_extension(export_format, compression=None):
+    extension = FILE_EXTENSIONS[export_format]
+    if export_format == 'CSV' and compression is not None:
+        extension += '.' + CSV_COMPRESSION_EXTENSIONS[compression]
+    return extension
+
+
+def project_columns(df, columns=None):
+    # Unlike df.loc[:, columns], building the frame from the column objects does not copy their data.
+    if columns is None:
+        return df
+    return pd.DataFrame({column: df[column] for column in columns}, copy=False)
+
+
+def open_csv_stream(path, compression=None):
+    if compression is None:
+        return open(path, 'wb')
+    if ARROW_AVAILABLE:
+        return pa.CompressedOutputStream(path, compression)
+    return gzip.open(path, 'wb')
+
+
+def write_csv(df, path, compression=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Rows are encoded one chunk at a time, so only a chunk of text is held in memory.
+    with open_csv_stream(path, compression) as stream:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            stream.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
+
+
+def write_parquet(df, path, compression='snappy', chunk_rows=EXPORT_CHUNK_ROWS):
+    schema = pa.Schema.from_pandas(df.iloc[:chunk_rows], preserve_index=False)
+    # Text columns that are empty in the first chunk would otherwise be typed as null for the whole file.
+    for index, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(index, field.with_type(pa.string()))
+    with parquet.ParquetWriter(path, schema, compression=compression) as writer:
+        for start in range(0, len(df), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema,
+                                                    preserve_index=False))
+
+
+def write_feather(df, path, compression=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feather.write_feather(table, path, compression=compression or 'uncompressed')
+
+
+def export_path(version, columns, export_format, compression=None):
+    key = f"{version}|{columns!r}|{export_format}|{compression}"
+    digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return os.path.join(EXPORT_DIR, f"{digest}.{file_extension(export_format, compression)}")
+
+
+def remove_old_exports(max_files=EXPORT_MAX_FILES):
+    entries = sorted(os.scandir(EXPORT_DIR), key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:max(0, len(entries) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def export_dataset(df, version, export_format='CSV', compression=None, columns=None):
+    # Files are named after the dataset version, so exporting the same version again reuses the file.
+    path = export_path(version, None if columns is None else tuple(columns), export_format, compression)
+    with _export_lock:
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        data = project_columns(df, columns)
+        temporary = f"{path}.tmp"
+        try:
+            if export_format == 'CSV':
+                write_csv(data, temporary, compression)
+            elif export_format == 'Parquet':
+                write_parquet(data, temporary, compression)
+            elif export_format == 'Feather':
+                write_feather(data, temporary, compression)
+            else:
+                raise ValueError(f"Unknown export format: {export_format}")
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        os.replace(temporary, path)
+        remove_old_exports()
+    return path
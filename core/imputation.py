@@ -0,0 +1,102 @@
+import pandas as pd
+
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES, DATETIME_DTYPES
+
+NUMERICAL_STRATEGIES = ["Mean", "Median", "Most Frequent", "Zero", "Forward Fill", "Backward Fill", "Interpolation",
+                        "Custom Value", "Drop Rows"]
+
+REPLACE_EMPTY_STRATEGIES = {
+    "object": ["Most Frequent", "Custom Value", "Drop Rows"],
+    "category": ["Most Frequent", "Custom Value", "Drop Rows"],
+    "string": ["Most Frequent", "Custom Value", "Drop Rows"],
+    "datetime64[ns]": ["Custom Value", "Drop Rows"],
+    **{dtype: NUMERICAL_STRATEGIES for dtype in NUMERICAL_DTYPES}
+}
+
+BATCH_STRATEGY_GROUPS = {
+    "numerical": NUMERICAL_DTYPES,
+    "categorical": CATEGORICAL_DTYPES,
+    "datetime": DATETIME_DTYPES,
+}
+
+VALUE_METHODS = ["Mean", "Median", "Most Frequent", "Zero"]
+
+
+def custom_fill_value(series, value):
+    # Typed text is converted to the column's type, so filling never leaves strings in a numeric or date column.
+    # Raises ValueError when the text is not a number or a date.
+    if series.dtype in NUMERICAL_DTYPES:
+        return pd.to_numeric(value)
+    if series.dtype in DATETIME_DTYPES:
+        return pd.Timestamp(value)
+    return value
+
+
+def fill_missing(series, method, value=None):
+    if method == "Most Frequent":
+        return series.fillna(series.mode()[0])
+    if method == "Custom Value":
+        value = custom_fill_value(series, value)
+        if series.dtype == 'category' and value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+        return series.fillna(value)
+    if method == "Mean":
+        return series.fillna(series.mean())
+    if method == "Median":
+        return series.fillna(series.median())
+    if method == "Zero":
+        return series.fillna(0)
+    if method == "Forward Fill":
+        return series.ffill()
+    if method == "Backward Fill":
+        return series.bfill()
+    if method == "Interpolation":
+        return series.interpolate()
+    return series
+
+
+def fill_values(df, columns_by_method):
+    # Statistics of all columns sharing a method are computed together in one reduction.
+    values = {}
+    if columns_by_method.get("Mean"):
+        values.update(df[columns_by_method["Mean"]].mean().to_dict())
+    if columns_by_method.get("Median"):
+        values.update(df[columns_by_method["Median"]].median().to_dict())
+    if columns_by_method.get("Most Frequent"):
+        values.update(df[columns_by_method["Most Frequent"]].mode().iloc[0].to_dict())
+    if columns_by_method.get("Zero"):
+        values.update(dict.fromkeys(columns_by_method["Zero"], 0))
+    return values
+
+
+def impute_columns(df, plan):
+    columns_by_method = {}
+    for column, method in plan:
+        columns_by_method.setdefault(method, []).append(column)
+
+    filled = {}
+    value_columns = [column for method in VALUE_METHODS for column in columns_by_method.get(method, [])]
+    if value_columns:
+        filled.update(df[value_columns].fillna(fill_values(df, columns_by_method)).items())
+    if columns_by_method.get("Forward Fill"):
+        filled.update(df[columns_by_method["Forward Fill"]].ffill().items())
+    if columns_by_method.get("Backward Fill"):
+        filled.update(df[columns_by_method["Backward Fill"]].bfill().items())
+    if columns_by_method.get("Interpolation"):
+        filled.update(df[columns_by_method["Interpolation"]].interpolate().items())
+
+    new_df = df.copy(deep=False)
+    for column, series in filled.items():
+        new_df[column] = series
+    if columns_by_method.get("Drop Rows"):
+        new_df = new_df.dropna(subset=columns_by_method["Drop Rows"])
+    return new_df
+
+
+def build_imputation_plan(df, columns, strategies):
+    plan = {}
+    for column in columns:
+        for group, dtypes in BATCH_STRATEGY_GROUPS.items():
+            if df[column].dtype in dtypes and strategies.get(group) is not None:
+                plan[column] = strategies[group]
+    return plan
@@ -0,0 +1,264 @@
+import datetime
+import hashlib
+import importlib.util
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals, is_bool_dtype, is_float_dtype, is_integer_dtype
+
+from core.backends import ARROW_BACKEND_MIN_BYTES, ArrowBackend
+from core.cache import LRUCache
+from core.datetimes import detect_datetime_columns, failed_count, infer_datetime_format, parse_datetime
+from core.store import dataset_store
+
+PARSER_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+CHUNK_ROWS = 500_000
+SCHEMA_SAMPLE_ROWS = 10_000
+CATEGORY_MAX_RATIO = 0.5
+STRING_DTYPE = 'string[pyarrow]' if PARSER_ENGINE == 'pyarrow' else 'object'
+STREAM_BLOCK_BYTES = 64 * 2 ** 20
+
+if PARSER_ENGINE == 'pyarrow':
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+# Frames live in the dataset store; this cache only keeps how each one was parsed.
+parsed_frames = LRUCache(max_entries=64)
+
+
+@dataclass
+class LoadedCsv:
+    # An ArrowBackend instead of a DataFrame for uploads streamed to disk.
+    df: pd.DataFrame
+    dataset_hash: str
+    engine: str
+    parse_seconds: float
+    cache_hit: bool
+    memory_report: pd.DataFrame = None
+    # Values per numeric or datetime column that did not parse as its type and were loaded as missing.
+    parse_failures: dict = None
+
+
+def content_hash(buffer):
+    digest = hashlib.blake2b(digest_size=16)
+    view = memoryview(buffer)
+    for start in range(0, len(view), HASH_BLOCK_SIZE):
+        digest.update(view[start:start + HASH_BLOCK_SIZE])
+    return digest.hexdigest()
+
+
+def dataset_key(file_hash, sep, decimal, compact=False):
+    key = f"{file_hash}|{sep}|{decimal}"
+    return f"{key}|compact" if compact else key
+
+
+def parse_csv(source, sep, decimal, engine=PARSER_ENGINE):
+    try:
+        source.seek(0)
+        df = pd.read_csv(source, sep=sep, decimal=decimal, engine=engine)
+    except ValueError:
+        # The pyarrow engine rejects some inputs the C parser copes with (ragged rows, odd quoting).
+        if engine == 'c':
+            raise
+        engine = 'c'
+        source.seek(0)
+        df = pd.read_csv(source, sep=sep, decimal=decimal, engine=engine)
+
+    for col in df.select_dtypes(include=['datetimetz']).columns:
+        # Offsets such as a trailing Z give timezone-aware columns; they are kept as naive UTC times.
+        df[col] = df[col].dt.tz_convert(None)
+    for col in df.select_dtypes(include=['datetime64']).columns:
+        if df.dtypes[col] != 'datetime64[ns]':
+            df[col] = df[col].astype('datetime64[ns]')
+    for col in df.select_dtypes(include=['object']).columns:
+        # pyarrow reads date-only columns as datetime.date objects instead of timestamps.
+        first = df[col].first_valid_index()
+        if first is not None and isinstance(df[col][first], datetime.date):
+            df[col] = pd.to_datetime(df[col]).astype('datetime64[ns]')
+    return df, engine
+
+
+def stream_batch_types(schema, date_formats):
+    # Matches parse_csv and detect_datetime_columns: every date column becomes datetime64[ns].
+    return pa.schema([field.with_type(pa.timestamp('ns')) if pa.types.is_date(field.type)
+                      or pa.types.is_timestamp(field.type) or field.name in date_formats else field
+                      for field in schema])
+
+
+def stream_batch(batch, schema, date_formats):
+    columns = []
+    for field in schema:
+        column = batch.column(field.name)
+        if field.name in date_formats:
+            parsed = parse_datetime(column.to_pandas(), date_formats[field.name])
+            if parsed is None:
+                raise ValueError(f"Column {field.name} changes its date format after the first block")
+            column = pa.array(parsed, type=pa.timestamp('ns'))
+        columns.append(column.cast(field.type))
+    return pa.record_batch(columns, schema=schema)
+
+
+def stream_csv_to_feather(path, target, sep, decimal, block_bytes=STREAM_BLOCK_BYTES):
+    # Record batches go from the CSV reader straight into an Arrow file, so the frame is never held in memory.
+    reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=block_bytes),
+                             parse_options=pa_csv.ParseOptions(delimiter=sep),
+                             convert_options=pa_csv.ConvertOptions(decimal_point=decimal, strings_can_be_null=True))
+    batches = iter(reader)
+    first = next(batches, None)
+    if first is None:
+        first = pa.RecordBatch.from_pylist([], schema=reader.schema)
+    # Text dates are detected on the first block, as detect_datetime_columns does on a sample.
+    date_formats = {field.name: infer_datetime_format(first.column(field.name).to_pandas())
+                    for field in reader.schema if pa.types.is_string(field.type)}
+    date_formats = {column: date_format for column, date_format in date_formats.items() if date_format}
+    schema = stream_batch_types(reader.schema, date_formats)
+    with pa.ipc.new_file(target, schema) as writer:
+        writer.write_batch(stream_batch(first, schema, date_formats))
+        for batch in batches:
+            writer.write_batch(stream_batch(batch, schema, date_formats))
+    return schema
+
+
+def infer_schema(sample):
+    schema = {}
+    date_formats = {}
+    for col in sample.columns:
+        series = sample[col]
+        if series.dtype != 'object':
+            schema[col] = 'keep' if is_bool_dtype(series) else 'numeric'
+            continue
+        date_format = infer_datetime_format(series)
+        if date_format is not None:
+            schema[col] = 'datetime'
+            date_formats[col] = date_format
+        elif series.nunique() <= CATEGORY_MAX_RATIO * series.count():
+            schema[col] = 'category'
+        else:
+            schema[col] = STRING_DTYPE
+    return schema, date_formats
+
+
+def downcast_numeric(series):
+    if is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if is_float_dtype(series):
+        compact = series.astype('float32')
+        # float32 is only kept when every value survives the round trip unchanged.
+        if np.array_equal(compact.to_numpy(), series.to_numpy(), equal_nan=True):
+            return compact
+    return series
+
+
+def compact_column(series, kind, date_format=None):
+    if kind == 'numeric':
+        if series.dtype == 'object':
+            # The leading sample looked numeric but this chunk has text in the column, which becomes missing.
+            series = pd.to_numeric(series, errors='coerce')
+        return downcast_numeric(series)
+    if kind == 'datetime':
+        parsed = parse_datetime(series, date_format)
+        if parsed is None:
+            # The format inferred from the leading sample does not fit this chunk, so infer it again here.
+            parsed = pd.to_datetime(series, format=infer_datetime_format(series), errors='coerce')
+        return parsed.astype('datetime64[ns]')
+    if kind == 'keep':
+        return series
+    return series.astype(kind)
+
+
+def combine_chunks(parts, kind):
+    if kind == 'category':
+        return pd.Series(union_categoricals(parts), name=parts[0].name)
+    return pd.concat(parts, ignore_index=True)
+
+
+def parse_csv_chunked(source, sep, decimal, chunksize=CHUNK_ROWS, failures=None):
+    source.seek(0)
+    sample = pd.read_csv(source, sep=sep, decimal=decimal, nrows=SCHEMA_SAMPLE_ROWS)
+    schema, date_formats = infer_schema(sample)
+    text_columns = {col: str for col, kind in schema.items() if kind not in ('numeric', 'keep')}
+
+    pieces = {col: [] for col in schema}
+    memory_before = dict.fromkeys(schema, 0)
+    source.seek(0)
+    for chunk in pd.read_csv(source, sep=sep, decimal=decimal, dtype=text_columns, chunksize=chunksize):
+        for col in chunk.columns:
+            memory_before[col] += chunk[col].memory_usage(deep=True, index=False)
+            pieces[col].append(compact_column(chunk[col], schema[col], date_formats.get(col)))
+            if failures is not None and schema[col] in ('numeric', 'datetime'):
+                if failed := failed_count(chunk[col], pieces[col][-1]):
+                    failures[col] = failures.get(col, 0) + failed
+        del chunk
+
+    columns = {}
+    for col in schema:
+        parts = pieces.pop(col)
+        columns[col] = combine_chunks(parts, schema[col]) if parts else sample[col].iloc[:0]
+    df = pd.DataFrame(columns, copy=False)
+
+    memory_after = df.memory_usage(deep=True, index=False)
+    memory_report = pd.DataFrame({
+        'Column Name': df.columns,
+        'Data Type': [str(dtype) for dtype in df.dtypes],
+        'Memory Before (MB)': [memory_before[col] / 2 ** 20 for col in df.columns],
+        'Memory After (MB)': memory_after.values / 2 ** 20,
+    })
+    return df, memory_report
+
+
+def stream_upload(source, key, sep, decimal):
+    # Large uploads go batch by batch into the store's Arrow file and are read back one column at a time.
+    source.seek(0)
+    try:
+        dataset_store.put_file(key, lambda path: stream_csv_to_feather(source, path, sep, decimal))
+    except ValueError:
+        # Rows the streaming reader rejects, or dates that change format within the file, need parse_csv.
+        return None
+    return ArrowBackend(dataset_store.file_path(key))
+
+
+def load_csv(source, sep, decimal, file_hash=None, compact=False, stream_min_bytes=ARROW_BACKEND_MIN_BYTES):
+    if file_hash is None:
+        file_hash = content_hash(source.getbuffer())
+    key = dataset_key(file_hash, sep, decimal, compact)
+
+    cached = parsed_frames.get(key)
+    handle = dataset_store.handle(key)
+    if cached is not None and handle is not None:
+        engine, parse_seconds, memory_report, parse_failures = cached
+        df = ArrowBackend(dataset_store.file_path(key)) if dataset_store.streamed(key) else handle.df
+        return LoadedCsv(df, key, engine, parse_seconds, True, memory_report, parse_failures)
+
+    parse_failures = {}
+    start = time.perf_counter()
+    if PARSER_ENGINE == 'pyarrow' and len(source.getbuffer()) >= stream_min_bytes:
+        backend = stream_upload(source, key, sep, decimal)
+        if backend is not None:
+            parse_seconds = time.perf_counter() - start
+            parsed_frames.put(key, ('pyarrow', parse_seconds, None, parse_failures))
+            return LoadedCsv(backend, key, 'pyarrow', parse_seconds, False, None, parse_failures)
+
+    if compact:
+        # pyarrow cannot read in chunks, so the memory-bounded mode always uses the C parser.
+        engine = 'c'
+        df, memory_report = parse_csv_chunked(source, sep, decimal, failures=parse_failures)
+    else:
+        df, engine = parse_csv(source, sep, decimal)
+        df = detect_datetime_columns(df, key, failures=parse_failures)
+        memory_report = None
+    parse_seconds = time.perf_counter() - start
+
+    # The parsed frame is dropped in favour of the store's memory-mapped copy shared by all sessions.
+    handle = dataset_store.put(key, df)
+    df = handle.df
+    if memory_report is not None:
+        # Measured on the frame the store hands back, which is the one every session keeps in memory.
+        memory_report = memory_report.assign(**{
+            'Data Type': [str(dtype) for dtype in df.dtypes],
+            'Memory After (MB)': df.memory_usage(deep=True, index=False).values / 2 ** 20,
+        })
+    parsed_frames.put(key, (engine, parse_seconds, memory_report, parse_failures))
+    return LoadedCsv(df, key, engine, parse_seconds, False, memory_report, parse_failures)
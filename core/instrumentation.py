@@ -0,0 +1,126 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+INSTRUMENTATION_LOG = os.environ.get('EDA_INSTRUMENTATION_LOG')
+PROFILE_TOP_FUNCTIONS = 40
+
+_state = threading.local()
+_log_lock = threading.Lock()
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Without procfs only the peak resident size is known, so deltas show growth of the peak.
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RerunRecord:
+    def __init__(self, page):
+        self.page = page
+        self.timestamp = time.time()
+        self.sections = []
+        self.payload_bytes = 0
+        self.profile = None
+        self.depth = 0
+
+    def count_payload(self, nbytes):
+        self.payload_bytes += nbytes
+
+    def to_dict(self):
+        return {'timestamp': self.timestamp, 'page': self.page, 'payload_bytes': self.payload_bytes,
+                'sections': self.sections}
+
+
+def current_record():
+    return getattr(_state, 'record', None)
+
+
+@contextmanager
+def measure(name):
+    # Sections are only recorded on a thread that is running an instrumented rerun.
+    record = current_record()
+    if record is None:
+        yield
+        return
+    section = {'name': name, 'depth': record.depth}
+    record.sections.append(section)
+    record.depth += 1
+    start, memory, payload = time.perf_counter(), rss_bytes(), record.payload_bytes
+    try:
+        yield
+    finally:
+        record.depth -= 1
+        section['seconds'] = time.perf_counter() - start
+        section['memory_delta_bytes'] = rss_bytes() - memory
+        section['payload_bytes'] = record.payload_bytes - payload
+
+
+def record_job(name, seconds, memory_delta_bytes):
+    # Background jobs run on their own threads, so their time is added to the rerun that uses the result.
+    record = current_record()
+    if record is None:
+        return
+    record.sections.append({'name': name, 'depth': record.depth, 'seconds': seconds,
+                            'memory_delta_bytes': memory_delta_bytes, 'payload_bytes': 0})
+
+
+def instrumented(function):
+    name = f"{function.__module__.split('.')[-1]}.{function.__qualname__}"
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with measure(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def profile_summary(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def append_log(record, path=INSTRUMENTATION_LOG):
+    if path is None:
+        return
+    with _log_lock, open(path, 'a') as file:
+        file.write(json.dumps(record.to_dict()) + '\n')
+
+
+@contextmanager
+def record_rerun(page, profile=False):
+    record = RerunRecord(page)
+    _state.record = record
+    profiler = cProfile.Profile() if profile else None
+    try:
+        with measure(page):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                yield record
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        _state.record = None
+        if profiler is not None:
+            record.profile = profile_summary(profiler)
+        append_log(record)
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.cache import LRUCache
+from core.instrumentation import rss_bytes
+
+JOB_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.progress = 0.0
+        self.message = "Waiting"
+        self.future = None
+        self.seconds = None
+        self.memory_delta_bytes = None
+        self._timing_claimed = False
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def status(self):
+        # A cancelled job keeps running until it reaches its next progress report, and is only 'cancelled'
+        # once it has actually stopped, so it cannot be started again next to itself.
+        if not self.future.done():
+            return 'cancelling' if self._cancel_event.is_set() else 'running'
+        if self.future.cancelled() or isinstance(self.future.exception(), JobCancelled):
+            return 'cancelled'
+        if self.future.exception() is not None:
+            return 'failed'
+        return 'done'
+
+    @property
+    def result(self):
+        return self.future.result() if self.status == 'done' else None
+
+    @property
+    def error(self):
+        return self.future.exception() if self.status == 'failed' else None
+
+    def run(self, function, *args, **kwargs):
+        # Timed on the job thread itself; reruns on the script thread only see the result.
+        start, memory = time.perf_counter(), rss_bytes()
+        try:
+            return function(*args, progress=self.report, **kwargs)
+        finally:
+            self.seconds = time.perf_counter() - start
+            self.memory_delta_bytes = rss_bytes() - memory
+
+    def claim_timing(self):
+        # True once, for the first rerun that uses the result, so the job's time is not counted again.
+        with self._lock:
+            claimed, self._timing_claimed = self._timing_claimed, True
+        return not claimed
+
+    def report(self, done, total, message=None):
+        # Long computations call this between steps, which is also where cancellation takes effect.
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress = done / total if total else 1.0
+        if message is not None:
+            self.message = message
+
+    def cancel(self):
+        self._cancel_event.set()
+        self.future.cancel()
+
+
+def collect_results(executor, futures, progress=None):
+    # Gathers {future: key} as they finish. If the job is cancelled or a task fails, the queued tasks are
+    # dropped, since leaving the executor's with block would otherwise wait for all of them.
+    results = {}
+    try:
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(futures))
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    return results
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS, max_finished=64):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='eda-job')
+        self._running = {}
+        self._finished = LRUCache(max_entries=max_finished)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            job = self._running.get(key)
+            if job is not None and job.future.done():
+                del self._running[key]
+                self._finished.put(key, job)
+            return job if job is not None else self._finished.get(key)
+
+    def submit(self, key, function, *args, **kwargs):
+        job = self.get(key)
+        if job is not None:
+            return job
+        job = Job(key)
+        with self._lock:
+            job.future = self._executor.submit(job.run, function, *args, **kwargs)
+            self._running[key] = job
+        return job
+
+    def cancel(self, key):
+        job = self.get(key)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, key):
+        with self._lock:
+            self._running.pop(key, None)
+        self._finished.pop(key)
+
+
+job_manager = JobManager()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+MISSING_CHUNK_ROWS = 1_048_576
+MAX_ROW_PATTERNS = 20
+
+
+class MissingProfile:
+    # Null masks are packed 8 rows to a byte and kept only for columns that have nulls, so the profile of a
+    # 10M-row column costs 1.25 MB and a complete column costs nothing.
+    def __init__(self, rows, counts, bitmaps):
+        self.rows = rows
+        self.counts = counts
+        self.bitmaps = bitmaps
+        self._co_missing = None
+        self._patterns = None
+
+    @classmethod
+    def from_frame(cls, df):
+        counts = {}
+        bitmaps = {}
+        for column in df.columns:
+            counts[column], bitmaps[column] = column_bitmap(df[column])
+        return cls(len(df), pd.Series(counts, index=df.columns, dtype='int64'),
+                   {column: bitmap for column, bitmap in bitmaps.items() if bitmap is not None})
+
+    def with_columns(self, df, columns):
+        # Only the given columns are scanned again; the other bitmaps are shared with this profile.
+        counts = self.counts.copy()
+        bitmaps = dict(self.bitmaps)
+        for column in columns:
+            counts[column], bitmap = column_bitmap(df[column])
+            bitmaps.pop(column, None)
+            if bitmap is not None:
+                bitmaps[column] = bitmap
+        return MissingProfile(self.rows, counts, bitmaps)
+
+    def renamed(self, columns):
+        return MissingProfile(self.rows, self.counts.rename(index=columns),
+                              {columns.get(column, column): bitmap for column, bitmap in self.bitmaps.items()})
+
+    @property
+    def missing_columns(self):
+        return [column for column in self.counts.index if column in self.bitmaps]
+
+    def mask(self, column):
+        if column not in self.bitmaps:
+            return np.zeros(self.rows, dtype=bool)
+        return np.unpackbits(self.bitmaps[column], count=self.rows).view(bool)
+
+    def _chunks(self, columns):
+        # Bit blocks of the given columns, a fixed number of rows at a time, so no full boolean frame is built.
+        packed = np.stack([self.bitmaps[column] for column in columns])
+        step = MISSING_CHUNK_ROWS // 8
+        for start in range(0, packed.shape[1], step):
+            rows = min(MISSING_CHUNK_ROWS, self.rows - start * 8)
+            yield np.unpackbits(packed[:, start:start + step], axis=1, count=rows)
+
+    def co_missingness(self):
+        # Rows where both columns are null; the diagonal holds each column's null count.
+        if self._co_missing is None:
+            columns = self.missing_columns
+            matrix = np.zeros((len(columns), len(columns)))
+            if columns:
+                for block in self._chunks(columns):
+                    block = block.astype('float32')
+                    matrix += block @ block.T
+            self._co_missing = pd.DataFrame(matrix.astype('int64'), index=columns, columns=columns)
+        return self._co_missing
+
+    def row_patterns(self, limit=MAX_ROW_PATTERNS):
+        # Rows grouped by which columns they are missing, most common pattern first.
+        if self._patterns is None:
+            columns = self.missing_columns
+            counts = pd.Series(dtype='int64')
+            if columns:
+                for block in self._chunks(columns):
+                    chunk = pd.Series(pattern_codes(block)).value_counts(sort=False)
+                    counts = counts.add(chunk, fill_value=0) if len(counts) else chunk
+            elif self.rows:
+                counts = pd.Series([self.rows], index=[0])
+            counts = counts.sort_values(ascending=False, kind='stable')
+            names = [", ".join(column for column, missing in zip(columns, pattern_bits(code, len(columns))) if missing)
+                     or "(none)" for code in counts.index]
+            self._patterns = pd.DataFrame({'Missing Columns': names, 'Rows': counts.values.astype('int64'),
+                                           'Row Percentage': counts.values / self.rows * 100 if self.rows else []})
+        return self._patterns if limit is None else self._patterns.head(limit)
+
+    @property
+    def pattern_count(self):
+        return len(self.row_patterns(limit=None))
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values())
+
+
+def column_bitmap(series):
+    mask = series.isna().to_numpy()
+    count = int(np.count_nonzero(mask))
+    return count, np.packbits(mask) if count else None
+
+
+def pattern_codes(block):
+    # Each row's null bits packed into bytes: one integer for up to 64 columns, opaque bytes beyond that.
+    codes = np.packbits(block, axis=0).T
+    if codes.shape[1] <= 8:
+        padded = np.zeros((codes.shape[0], 8), dtype='uint8')
+        padded[:, :codes.shape[1]] = codes
+        return padded.view('>u8').ravel().astype('uint64')
+    return [row.tobytes() for row in codes]
+
+
+def pattern_bits(code, width):
+    if isinstance(code, bytes):
+        code = np.frombuffer(code, dtype='uint8')
+    else:
+        code = np.frombuffer(int(code).to_bytes(8, 'big'), dtype='uint8')
+    return np.unpackbits(code, count=width).view(bool)
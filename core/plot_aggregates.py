@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.cache import LRUCache, value_bytes
+from core.dtypes import CATEGORICAL_DTYPES, DATETIME_DTYPES, NUMERICAL_DTYPES
+from core.sketches import column_sketch
+
+HISTOGRAM_BINS = 50
+MAX_CATEGORIES = 50
+DENSITY_BINS = 100
+SVG_MAX_POINTS = 10_000
+DEFAULT_POINT_BUDGET = 50_000
+DENSITY_MIN_ROWS = 2_000_000
+BOX_VALUE_FIELDS = ['q1', 'median', 'q3', 'mean', 'lowerfence', 'upperfence']
+PLOT_AGGREGATES_BYTES = int(os.environ.get('EDA_PLOT_AGGREGATES_BYTES', 256 * 2 ** 20))
+
+# Histograms and box statistics are small, but 'counts' entries hold a column's full value counts.
+plot_aggregates = LRUCache(max_entries=256, max_bytes=PLOT_AGGREGATES_BYTES, sizeof=value_bytes)
+
+
+def valid_values(series):
+    if series.dtype in DATETIME_DTYPES:
+        values = series.dropna().to_numpy().view('int64')
+    else:
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+    return values
+
+
+def numeric_array(series):
+    if series.dtype in DATETIME_DTYPES:
+        values = series.to_numpy().view('int64').astype('float64')
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def axis_values(values, series):
+    if series.dtype in DATETIME_DTYPES:
+        return pd.to_datetime(values.astype('int64'))
+    return values
+
+
+def histogram_bins(series, bins=HISTOGRAM_BINS):
+    values = valid_values(series)
+    if values.size == 0:
+        return pd.DataFrame({'start': [], 'end': [], 'center': [], 'count': []})
+    counts, edges = np.histogram(values, bins=bins)
+    histogram = pd.DataFrame({'start': edges[:-1], 'end': edges[1:], 'count': counts})
+    histogram['center'] = (histogram['start'] + histogram['end']) / 2
+    if series.dtype in DATETIME_DTYPES:
+        for column in ['start', 'end', 'center']:
+            histogram[column] = pd.to_datetime(histogram[column].astype('int64'))
+    return histogram
+
+
+def box_statistics(series):
+    values = valid_values(series)
+    if values.size == 0:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'mean': values.mean(),
+        'lowerfence': inside.min(),
+        'upperfence': inside.max(),
+        'outliers': int(values.size - inside.size),
+    }
+
+
+def sketch_histogram(sketch, bins=HISTOGRAM_BINS):
+    # Bin counts are read off the quantile sketch's distribution, each within its rank error of the total.
+    quantiles = sketch.quantiles
+    if quantiles.count == 0:
+        return pd.DataFrame({'start': [], 'end': [], 'center': [], 'count': []})
+    edges = np.linspace(quantiles.min, quantiles.max, bins + 1)
+    below = np.concatenate([[0], quantiles.rank(edges[1:])]) * quantiles.count
+    histogram = pd.DataFrame({'start': edges[:-1], 'end': edges[1:], 'count': np.round(np.diff(below)).astype('int64')})
+    histogram['center'] = (histogram['start'] + histogram['end']) / 2
+    if sketch.kind == 'datetime':
+        for column in ['start', 'end', 'center']:
+            histogram[column] = pd.to_datetime(histogram[column].astype('int64'))
+    return histogram
+
+
+def sketch_box_statistics(sketch):
+    quantiles = sketch.quantiles
+    if quantiles.count == 0:
+        return None
+    q1, median, q3 = quantiles.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    # The whiskers end on retained items, or on the exact extremes when those are inside the fences.
+    items, _ = quantiles.weighted_items()
+    inside = items[(items >= lower) & (items <= upper)]
+    outside = quantiles.rank(np.nextafter(lower, -np.inf)) + 1 - quantiles.rank(upper)
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'mean': sketch.moments.mean,
+        'lowerfence': quantiles.min if quantiles.min >= lower else inside.min(),
+        'upperfence': quantiles.max if quantiles.max <= upper else inside.max(),
+        'outliers': int(round(outside * quantiles.count)),
+    }
+
+
+def top_value_counts(counts, limit=MAX_CATEGORIES, total=None, distinct=None):
+    # Approximate counts only cover the most frequent values, so the total and distinct count are passed in.
+    top = counts.iloc[:limit]
+    distinct = len(counts) if distinct is None else distinct
+    total = counts.sum() if total is None else total
+    value_counts = pd.DataFrame({'value': top.index.astype(str), 'count': top.values})
+    if distinct > limit:
+        other = pd.DataFrame({'value': [f"Other ({distinct - limit} values)"], 'count': [total - top.sum()]})
+        value_counts = pd.concat([value_counts, other], ignore_index=True)
+    return value_counts
+
+
+def cached_aggregate(kind, compute, df, column, version=None):
+    if version is None:
+        return compute(df[column])
+    return plot_aggregates.get_or_compute((version, column, kind), lambda: compute(df[column]))[0]
+
+
+def compute_plot_aggregates(df, columns, version=None, progress=None, approximate=False):
+    # Warms the aggregate caches so that drawing the plots afterwards is only figure building.
+    for done, column in enumerate(columns):
+        if progress is not None:
+            progress(done, len(columns), f"Aggregating {column}")
+        if approximate:
+            column_sketch(df, column, version)
+        elif df[column].dtype in NUMERICAL_DTYPES:
+            cached_aggregate('histogram', histogram_bins, df, column, version)
+            cached_aggregate('box', box_statistics, df, column, version)
+        elif df[column].dtype in DATETIME_DTYPES:
+            cached_aggregate('histogram', histogram_bins, df, column, version)
+        elif df[column].dtype not in CATEGORICAL_DTYPES:
+            cached_aggregate('counts', lambda series: series.value_counts(), df, column, version)
+    return True
+
+
+def render_strategy(rows, point_budget=DEFAULT_POINT_BUDGET):
+    if rows > DENSITY_MIN_ROWS:
+        return 'density'
+    if rows > point_budget:
+        return 'sample'
+    if rows > SVG_MAX_POINTS:
+        return 'webgl'
+    return 'svg'
+
+
+def sample_rows(df, columns, point_budget, stratify=None, seed=0):
+    if len(df) <= point_budget:
+        return df[columns]
+    if stratify is None:
+        return df[columns].sample(n=point_budget, random_state=seed)
+    # Proportional quota per category, with at least one point so rare groups stay visible.
+    codes, _ = pd.factorize(df[stratify], use_na_sentinel=False)
+    quotas = np.maximum(1, np.round(np.bincount(codes) * point_budget / len(df)))
+    ranks = pd.Series(np.random.default_rng(seed).random(len(df))).groupby(codes).rank(method='first')
+    return df[columns].iloc[np.flatnonzero(ranks.to_numpy() <= quotas[codes])]
+
+
+def density_grid(df, xs, ys, bins=DENSITY_BINS):
+    x = numeric_array(df[xs])
+    y = numeric_array(df[ys])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=bins)
+    x_centers = axis_values((x_edges[:-1] + x_edges[1:]) / 2, df[xs])
+    y_centers = axis_values((y_edges[:-1] + y_edges[1:]) / 2, df[ys])
+    return x_centers, y_centers, counts.T
+
+
+def category_density_grid(df, categorical, numerical, bins=DENSITY_BINS):
+    codes, categories = pd.factorize(df[categorical], sort=True)
+    values = numeric_array(df[numerical])
+    valid = (codes >= 0) & ~np.isnan(values)
+    counts, _, y_edges = np.histogram2d(codes[valid], values[valid],
+                                        bins=[np.arange(len(categories) + 1) - 0.5, bins])
+    y_centers = axis_values((y_edges[:-1] + y_edges[1:]) / 2, df[numerical])
+    return categories.astype(str), y_centers, counts.T
+
+
+def grouped_box_statistics(df, categorical, numerical):
+    statistics = {str(category): stats for category, group in df.groupby(categorical, observed=True)[numerical]
+                  if (stats := box_statistics(group)) is not None}
+    if df[numerical].dtype in DATETIME_DTYPES:
+        # Box statistics of dates come out in nanoseconds, so they are turned back into timestamps for the axis.
+        for stats in statistics.values():
+            for field in BOX_VALUE_FIELDS:
+                stats[field] = axis_values(np.array([stats[field]]), df[numerical])[0]
+    return statistics
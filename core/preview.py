@@ -0,0 +1,69 @@
+import operator
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from core.backends import as_backend
+from core.cache import LRUCache
+from core.dtypes import DATETIME_DTYPES, NUMERICAL_DTYPES
+
+PAGE_SIZES = [25, 50, 100, 500]
+DEFAULT_PAGE_SIZE = 50
+COMPARISON = re.compile(r'^\s*(<=|>=|!=|==|=|<|>)?\s*(.+?)\s*$')
+COMPARISON_OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+                        '=': operator.eq, '==': operator.eq, '!=': operator.ne, None: operator.eq}
+PREVIEW_ORDERS_BYTES = int(os.environ.get('EDA_PREVIEW_ORDERS_BYTES', 256 * 2 ** 20))
+
+# Each order is a full-length array of row positions, so the cache is bounded by bytes rather than by count.
+preview_orders = LRUCache(max_entries=32, max_bytes=PREVIEW_ORDERS_BYTES, sizeof=lambda positions: positions.nbytes)
+preview_windows = LRUCache(max_entries=128)
+
+
+def filter_mask(series, query):
+    # Numeric and datetime columns take comparisons such as "> 5"; other columns match a substring.
+    if series.dtype in NUMERICAL_DTYPES or series.dtype in DATETIME_DTYPES:
+        symbol, value = COMPARISON.match(query).groups()
+        try:
+            value = pd.Timestamp(value) if series.dtype in DATETIME_DTYPES else float(value)
+        except ValueError:
+            return np.zeros(len(series), dtype=bool)
+        return COMPARISON_OPERATORS[symbol](series, value).fillna(False).to_numpy(dtype=bool)
+    return series.astype(str).str.contains(query, case=False, regex=False).to_numpy(dtype=bool) & \
+        series.notna().to_numpy()
+
+
+def row_order(df, sort_by=None, ascending=True, filter_column=None, query=None):
+    positions = np.arange(len(df))
+    if filter_column is not None and query:
+        positions = np.flatnonzero(filter_mask(df[filter_column], query))
+    if sort_by is not None:
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def preview_window(df, offset, size, version=None, sort_by=None, ascending=True, filter_column=None, query=None):
+    # Only the requested rows are sliced out; the filtered and sorted row order is cached per version.
+    # Accepts a DataFrame or any backend, so datasets kept on disk are previewed without loading them.
+    df = as_backend(df)
+    if filter_column is None or not query:
+        filter_column, query = None, None
+    order_key = (sort_by, ascending, filter_column, query)
+    if sort_by is None and filter_column is None:
+        total = len(df)
+        compute = lambda: df.take(slice(offset, offset + size))
+    else:
+        if version is None:
+            positions = row_order(df, *order_key)
+        else:
+            positions, _ = preview_orders.get_or_compute((version, *order_key),
+                                                         lambda: row_order(df, *order_key))
+        total = len(positions)
+        compute = lambda: df.take(positions[offset:offset + size])
+
+    if version is None:
+        return compute(), total
+    return preview_windows.get_or_compute((version, *order_key, offset, size), compute)[0], total
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.backends import as_backend
+from core.cache import LRUCache, value_bytes
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES, DATETIME_DTYPES
+from core.sketches import column_sketch
+
+COLUMN_PROFILES_BYTES = int(os.environ.get('EDA_COLUMN_PROFILES_BYTES', 256 * 2 ** 20))
+
+# Categorical profiles hold full value counts, as large as the column itself for ID-like columns.
+column_profiles = LRUCache(max_entries=256, max_bytes=COLUMN_PROFILES_BYTES, sizeof=value_bytes)
+
+
+def numeric_profile(series):
+    # One extraction of the valid values feeds every aggregate instead of a separate pandas scan each.
+    if series.dtype.kind in 'iu':
+        values = series.to_numpy()
+    else:
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {'Mean': np.nan, 'Median': np.nan, 'Std Dev': np.nan, 'Min': np.nan, 'Max': np.nan}
+    return {
+        'Mean': values.mean(dtype='float64'),
+        'Median': np.median(values),
+        'Std Dev': values.std(dtype='float64', ddof=1) if values.size > 1 else np.nan,
+        'Min': values.min(),
+        'Max': values.max(),
+    }
+
+
+def categorical_profile(series):
+    counts = series.value_counts()
+    return {'Counts': counts[counts > 0], 'Total': len(series)}
+
+
+def datetime_profile(series):
+    return {'Earliest Date': series.min(), 'Latest Date': series.max()}
+
+
+def compute_profile(series):
+    if series.dtype in NUMERICAL_DTYPES:
+        return numeric_profile(series)
+    if series.dtype in CATEGORICAL_DTYPES:
+        return categorical_profile(series)
+    if series.dtype in DATETIME_DTYPES:
+        return datetime_profile(series)
+    return {}
+
+
+def approximate_profile(sketch):
+    # Same keys as the exact profiles, plus the error bound of every approximated value.
+    if sketch.kind == 'numeric':
+        moments, quantiles = sketch.moments, sketch.quantiles
+        if moments.count == 0:
+            return {'Mean': np.nan, 'Median': np.nan, 'Std Dev': np.nan, 'Min': np.nan, 'Max': np.nan,
+                    'Median Rank Error': np.nan}
+        return {
+            'Mean': moments.mean,
+            'Median': quantiles.quantile(0.5),
+            'Std Dev': moments.std,
+            'Min': moments.min,
+            'Max': moments.max,
+            'Median Rank Error': quantiles.rank_error,
+        }
+    if sketch.kind == 'datetime':
+        return {'Earliest Date': sketch.earliest, 'Latest Date': sketch.latest}
+    return {
+        'Counts': sketch.frequent.counters,
+        'Total': sketch.rows,
+        'Count Error': sketch.frequent.error,
+        'Distinct': max(round(sketch.distinct.estimate()), len(sketch.frequent.counters)),
+        'Distinct Error': sketch.distinct.relative_error,
+    }
+
+
+def column_profile(df, column, version=None, approximate=False):
+    if approximate:
+        return approximate_profile(column_sketch(df, column, version))
+    if version is None:
+        return compute_profile(df[column])
+    return column_profiles.get_or_compute((version, column), lambda: compute_profile(df[column]))[0]
+
+
+def statistics_table(df, columns, version=None, progress=None, approximate=False):
+    statistics = []
+    for done, column in enumerate(columns):
+        if progress is not None:
+            progress(done, len(columns), f"Profiling {column}")
+        profile = column_profile(df, column, version, approximate)
+        if df[column].dtype in NUMERICAL_DTYPES or df[column].dtype in DATETIME_DTYPES:
+            statistics.append(pd.DataFrame([{'Variable': column, **profile}]))
+        elif df[column].dtype in CATEGORICAL_DTYPES:
+            counts = profile['Counts']
+            table = pd.DataFrame({
+                'Variable': column,
+                'Value': counts.index.astype(object),
+                'Count': counts.values,
+                'Count Percentage': counts.values / profile['Total'] * 100,
+            })
+            if approximate:
+                # Only the most frequent values are tracked; each count may be low by up to Count Error.
+                table['Count Error'] = profile['Count Error']
+                table['Distinct'] = profile['Distinct']
+            statistics.append(table)
+
+    if not statistics:
+        return pd.DataFrame()
+    statistics_df = pd.concat(statistics, ignore_index=True)
+    statistics_df.index += 1
+    return statistics_df
+
+
+def get_missing_values(df, missing_counts=None):
+    missing_values_count = as_backend(df).null_counts() if missing_counts is None else missing_counts
+    missing_values_df = missing_values_count[missing_values_count > 0]
+    return pd.DataFrame({'Column Name': missing_values_df.index, 'Missing Values Count': missing_values_df.values})
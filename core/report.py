@@ -0,0 +1,79 @@
+import html
+import json
+
+import pandas as pd
+
+from core.backends import as_backend
+from core.bivariate import association_statistics, split_variables
+from core.profiling import get_missing_values, statistics_table
+
+MAX_REPORT_VALUES = 50
+MAX_PAIRWISE_CATEGORIES = 1000
+REPORT_TABLES = {
+    'missing': "Missing values",
+    'statistics': "Variable statistics",
+    'correlation': "Correlation matrix",
+    'chi_square': "Chi-square tests",
+    'kruskal': "Kruskal-Wallis tests",
+}
+
+
+def pairwise_columns(df, columns, max_categories=MAX_PAIRWISE_CATEGORIES):
+    # ID-like text columns make the pairwise tests as large as the file itself, so they are left out of them.
+    _, categorical = split_variables(df, columns)
+    skipped = [column for column in categorical if df[column].nunique() > max_categories]
+    return [column for column in columns if column not in skipped], skipped
+
+
+def profile_dataset(df, name, version=None):
+    # Accepts a DataFrame or any backend; with the Arrow backend the file is read one column at a time.
+    df = as_backend(df)
+    statistics = statistics_table(df, df.columns.tolist(), version)
+    if 'Value' in statistics:
+        # Long-tailed categorical columns keep only their most frequent values.
+        statistics = statistics.groupby('Variable', sort=False).head(MAX_REPORT_VALUES)
+    tables = {'missing': get_missing_values(df), 'statistics': statistics}
+    columns, skipped = pairwise_columns(df, df.columns.tolist())
+    tables.update(association_statistics(df, columns, version))
+    return {
+        'name': name,
+        'rows': len(df),
+        'columns': len(df.columns),
+        'backend': df.name,
+        'memory_bytes': df.nbytes,
+        'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()},
+        'tables': tables,
+        'pairwise_skipped': skipped,
+    }
+
+
+def report_json(report):
+    tables = {}
+    for key, table in report['tables'].items():
+        orient = 'split' if key == 'correlation' else 'records'
+        # to_json writes NaN as null and timestamps as ISO strings, which json.dumps cannot do.
+        tables[key] = json.loads(table.to_json(orient=orient, date_format='iso'))
+    return json.dumps({**report, 'tables': tables}, indent=2)
+
+
+def report_html(report):
+    sections = [f"<h1>{html.escape(report['name'])}</h1>",
+                f"<p>{report['rows']:,} rows, {report['columns']} columns, "
+                f"{report['memory_bytes'] / 2 ** 20:.1f} MB in memory</p>",
+                pd.DataFrame({'Column': list(report['dtypes']), 'Type': list(report['dtypes'].values())})
+                .to_html(index=False)]
+    if report['pairwise_skipped']:
+        sections.append(f"<p>Left out of the pairwise tests for having more than {MAX_PAIRWISE_CATEGORIES:,} "
+                        f"values: {html.escape(', '.join(report['pairwise_skipped']))}</p>")
+    for key, title in REPORT_TABLES.items():
+        table = report['tables'].get(key)
+        if table is None or table.empty:
+            continue
+        sections.append(f"<h2>{title}</h2>")
+        sections.append(table.to_html(index=key == 'correlation', float_format=lambda value: f"{value:.4g}",
+                                      na_rep=''))
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(report['name'])}</title>"
+            "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+            "td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>"
+            + "\n".join(sections) + "</body></html>")
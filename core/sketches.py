@@ -0,0 +1,283 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from core.cache import LRUCache
+from core.dtypes import DATETIME_DTYPES, NUMERICAL_DTYPES
+
+KLL_K = 200
+HLL_PRECISION = 14
+TOP_K_COUNTERS = 200
+SKETCH_CHUNK_ROWS = 1_000_000
+
+
+def kll_rank_error(k):
+    # Normalised rank error of a single quantile at 99% confidence, as tabulated for KLL by Apache DataSketches.
+    return 2.296 / k ** 0.9723
+
+
+def hll_relative_error(precision):
+    # Standard error of the estimate, relative to the true count.
+    return 1.04 / math.sqrt(2 ** precision)
+
+
+column_sketches = LRUCache(max_entries=256)
+
+
+class KLLSketch:
+    # Quantile sketch from Karnin, Lang and Liberty: level h keeps items of weight 2 ** h and, when full,
+    # sorts itself and promotes every other item to level h + 1, so a column of any length fits in O(k) items.
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        return kll_rank_error(self.k)
+
+    def _capacity(self, level):
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1)))
+
+    def _compress(self):
+        while True:
+            full = [level for level, items in enumerate(self.levels) if items.size > self._capacity(level)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            # An odd item out stays behind so that every promoted item stands for exactly two.
+            keep = items.size % 2
+            offset = self._rng.integers(2)
+            self.levels[level] = items[items.size - keep:]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset:items.size - keep:2]])
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** height, dtype='float64')
+                                  for height, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items, cumulative = self.weighted_items()
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        values = items[np.minimum(positions, items.size - 1)]
+        # The exact extremes are tracked separately, so the ends of the range are never approximated.
+        values = np.where(np.asarray(q) <= 0, self.min, np.where(np.asarray(q) >= 1, self.max, values))
+        return values if np.ndim(q) else values.item()
+
+    def rank(self, values):
+        # Fraction of the column at or below each value.
+        if self.count == 0:
+            return np.zeros(np.shape(values))
+        items, cumulative = self.weighted_items()
+        positions = np.searchsorted(items, values, side='right')
+        return np.where(positions > 0, cumulative[np.maximum(positions - 1, 0)], 0) / cumulative[-1]
+
+
+class HyperLogLog:
+    # Distinct count from the longest run of leading zeros seen in each of 2 ** precision hash buckets.
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype='uint8')
+
+    @property
+    def relative_error(self):
+        return hll_relative_error(self.precision)
+
+    def update(self, series):
+        if series.empty:
+            return self
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype('intp')
+        rest = hashes << np.uint64(self.precision)
+        # frexp gives bit lengths exactly for 32-bit halves, where float64 cannot round.
+        high = np.frexp((rest >> np.uint64(32)).astype('float64'))[1]
+        low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype('float64'))[1]
+        leading_zeros = 64 - np.where(high > 0, high + 32, low)
+        np.maximum.at(self.registers, buckets, (np.minimum(leading_zeros, 64 - self.precision) + 1).astype('uint8'))
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.registers.size
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype('int64')))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            # Linear counting is more accurate while many buckets are still empty.
+            return m * math.log(m / empty)
+        return raw
+
+
+class MisraGries:
+    # Frequent values with at most `capacity` counters; every reported count is low by at most `error`,
+    # and any value without a counter occurs at most `error` times.
+    def __init__(self, capacity=TOP_K_COUNTERS):
+        self.capacity = capacity
+        self.count = 0
+        self.error = 0
+        self.counters = pd.Series(dtype='int64')
+
+    def _add(self, counts, error=0):
+        counters = self.counters.add(counts, fill_value=0) if len(self.counters) else counts
+        self.error += error
+        if len(counters) > self.capacity:
+            threshold = counters.nlargest(self.capacity + 1).iloc[-1]
+            counters = counters[counters > threshold] - threshold
+            self.error += threshold
+        self.counters = counters.astype('int64').sort_values(ascending=False, kind='stable')
+
+    def update(self, series):
+        counts = series.value_counts(sort=False)
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(object)
+        self.count += int(counts.sum())
+        self._add(counts)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self._add(other.counters, other.error)
+        return self
+
+
+class Moments:
+    # Exact count, mean, variance and extremes, merged with Chan's parallel update.
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _add(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+        return self
+
+    def update(self, values):
+        if values.size == 0:
+            return self
+        mean = values.mean(dtype='float64')
+        return self._add(values.size, mean, float(np.sum((values - mean) ** 2)), values.min(), values.max())
+
+    def merge(self, other):
+        return self._add(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+
+class ColumnSketch:
+    # Bounded-memory summary of one column; sketches of separate chunks merge into the sketch of their union.
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        if kind == 'numeric':
+            self.moments = Moments()
+        if kind in ('numeric', 'datetime'):
+            self.quantiles = KLLSketch()
+        if kind == 'datetime':
+            # Nanosecond timestamps do not fit a float64 exactly, so the extremes are kept as Timestamps.
+            self.earliest = pd.NaT
+            self.latest = pd.NaT
+        if kind == 'categorical':
+            self.distinct = HyperLogLog()
+            self.frequent = MisraGries()
+
+    def update(self, series):
+        self.rows += len(series)
+        if self.kind == 'numeric':
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+            values = values[~np.isnan(values)]
+            self.moments.update(values)
+            self.quantiles.update(values)
+        elif self.kind == 'datetime':
+            valid = series.dropna()
+            if len(valid):
+                self.earliest = min(self.earliest, valid.min()) if self.earliest is not pd.NaT else valid.min()
+                self.latest = max(self.latest, valid.max()) if self.latest is not pd.NaT else valid.max()
+            self.quantiles.update(valid.to_numpy().view('int64').astype('float64'))
+        else:
+            valid = series.dropna()
+            self.distinct.update(valid)
+            self.frequent.update(valid)
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        if self.kind == 'numeric':
+            self.moments.merge(other.moments)
+        if self.kind in ('numeric', 'datetime'):
+            self.quantiles.merge(other.quantiles)
+        if self.kind == 'datetime':
+            self.earliest = min([date for date in (self.earliest, other.earliest) if date is not pd.NaT], default=pd.NaT)
+            self.latest = max([date for date in (self.latest, other.latest) if date is not pd.NaT], default=pd.NaT)
+        if self.kind == 'categorical':
+            self.distinct.merge(other.distinct)
+            self.frequent.merge(other.frequent)
+        return self
+
+
+def sketch_kind(dtype):
+    if dtype in NUMERICAL_DTYPES:
+        return 'numeric'
+    if dtype in DATETIME_DTYPES:
+        return 'datetime'
+    return 'categorical'
+
+
+def sketch_series(series, chunk_rows=SKETCH_CHUNK_ROWS):
+    # One pass over fixed-size slices, so only a slice's temporaries are alive at a time.
+    sketch = ColumnSketch(sketch_kind(series.dtype))
+    for start in range(0, len(series), chunk_rows):
+        sketch.update(series.iloc[start:start + chunk_rows])
+    return sketch
+
+
+def column_sketch(df, column, version=None):
+    if version is None:
+        return sketch_series(df[column])
+    return column_sketches.get_or_compute((version, column), lambda: sketch_series(df[column]))[0]
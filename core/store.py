@@ -0,0 +1,231 @@
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.cache import LRUCache
+
+FEATHER_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+STORE_DIR = os.environ.get('EDA_STORE_DIR', os.path.join(tempfile.gettempdir(), 'eda-app-store'))
+MEMORY_BUDGET_BYTES = int(os.environ.get('EDA_STORE_MEMORY_BYTES', 4 * 2 ** 30))
+DISK_BUDGET_BYTES = int(os.environ.get('EDA_STORE_DISK_BYTES', 32 * 2 ** 30))
+
+if FEATHER_AVAILABLE:
+    import pyarrow as pa
+    from pyarrow import feather
+
+
+def write_file(path, write):
+    # The rename makes the file appear complete or not at all.
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(temporary)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+
+def write_feather(df, path):
+    # Uncompressed Feather files can be memory-mapped.
+    return write_file(path, lambda temporary: feather.write_feather(df, temporary, compression='uncompressed'))
+
+
+def arrow_string_dtype(arrow_type):
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def object_column(series):
+    # Arrow stores an object column as the type of its values; the values go back into an object column.
+    if series.dtype.kind == 'M':
+        series = series.astype('datetime64[ns]')
+    return series if series.dtype == 'object' else series.astype(object)
+
+
+def read_feather(path):
+    # Numeric columns without missing values stay backed by the mapped file instead of anonymous memory.
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    # pandas restores string columns as python objects and object columns as whatever Arrow inferred for them;
+    # both are put back to the dtype they were written with.
+    numpy_types = {column['name']: column['numpy_type']
+                   for column in (table.schema.pandas_metadata or {}).get('columns', [])
+                   if column['name'] in table.column_names}
+    strings = [name for name, numpy_type in numpy_types.items() if numpy_type == 'string']
+    objects = [name for name, numpy_type in numpy_types.items() if numpy_type == 'object']
+    df = table.drop_columns(strings + objects).to_pandas(split_blocks=True)
+    restored = {}
+    if strings:
+        restored.update(table.select(strings).to_pandas(types_mapper=arrow_string_dtype).items())
+    if objects:
+        restored.update((name, object_column(series))
+                        for name, series in table.select(objects).to_pandas(integer_object_nulls=True).items())
+    for index, name in enumerate(table.column_names):
+        if name in restored:
+            df.insert(index, name, restored[name])
+    for name, dtype in df.dtypes.items():
+        # Timestamps come back in the unit Arrow stored them in, while the app works in nanoseconds.
+        if isinstance(dtype, np.dtype) and dtype.kind == 'M' and dtype != 'datetime64[ns]':
+            df[name] = df[name].astype('datetime64[ns]')
+    return df, frame_bytes(df)
+
+
+class DatasetHandle:
+    def __init__(self, store, key, frame=None):
+        self.key = key
+        self._store = store
+        # Frames that could not be written to disk are pinned by the handle itself.
+        self._frame = frame
+
+    @property
+    def df(self):
+        if self._frame is not None:
+            return self._frame
+        df = self._store.get(self.key)
+        if df is None:
+            raise LookupError(f"Dataset {self.key} is no longer stored, load the file again")
+        return df
+
+
+class DatasetStore:
+    def __init__(self, directory=STORE_DIR, memory_budget=MEMORY_BUDGET_BYTES, disk_budget=DISK_BUDGET_BYTES):
+        self.directory = directory
+        self.disk_budget = disk_budget
+        self._resident = LRUCache(max_entries=256, max_bytes=memory_budget, sizeof=lambda entry: entry[1])
+        self._files = OrderedDict()
+        # Frames Feather cannot write stay in memory, so later loads of the same key still find them.
+        self._pinned = LRUCache(max_entries=64, max_bytes=memory_budget, sizeof=frame_bytes)
+        # Datasets written straight to disk without ever being a DataFrame, which are read column by column.
+        self._streamed = set()
+        self._handles = {}
+        self._lock = threading.RLock()
+        if FEATHER_AVAILABLE:
+            os.makedirs(directory, exist_ok=True)
+            # Files left by a previous run are reused, oldest first in eviction order.
+            entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.feather')]
+            for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+                self._files[entry.name] = entry.stat().st_size
+
+    def filename(self, key):
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '.feather'
+
+    def path(self, key):
+        return os.path.join(self.directory, self.filename(key))
+
+    def file_path(self, key):
+        return self.path(key) if self.filename(key) in self._files else None
+
+    def __contains__(self, key):
+        return key in self._pinned or key in self._resident or self.filename(key) in self._files
+
+    def handle(self, key):
+        pinned = self._pinned.get(key)
+        if pinned is not None:
+            return DatasetHandle(self, key, pinned)
+        if key not in self:
+            return None
+        return self._track(DatasetHandle(self, key))
+
+    def put(self, key, df):
+        if key in self:
+            return self.handle(key)
+        if not FEATHER_AVAILABLE:
+            return self._pin(key, df)
+        try:
+            size = write_feather(df, self.path(key))
+        except (pa.ArrowException, ValueError, TypeError):
+            # Mixed-type object columns and non-string column names have no Feather representation.
+            return self._pin(key, df)
+        return self._register(key, size)
+
+    def put_file(self, key, write):
+        # `write(path)` writes the dataset as an Arrow file, such as a CSV upload streamed batch by batch.
+        if key not in self:
+            self._register(key, write_file(self.path(key), write))
+        with self._lock:
+            self._streamed.add(key)
+        return self.handle(key)
+
+    def streamed(self, key):
+        return key in self._streamed
+
+    def _register(self, key, size):
+        with self._lock:
+            self._files[self.filename(key)] = size
+            handle = self._track(DatasetHandle(self, key))
+            self.evict_files()
+        return handle
+
+    def _pin(self, key, df):
+        self._pinned.put(key, df)
+        return DatasetHandle(self, key, df)
+
+    def get(self, key):
+        pinned = self._pinned.get(key)
+        if pinned is not None:
+            return pinned
+        entry = self._resident.get(key)
+        if entry is not None:
+            return entry[0]
+        with self._lock:
+            name = self.filename(key)
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+            entry = self._resident.get(key)
+            if entry is None:
+                # Reading back a spilled dataset only maps the file; pages are loaded on access.
+                entry = read_feather(self.path(key))
+                self._resident.put(key, entry)
+        return entry[0]
+
+    def _track(self, handle):
+        with self._lock:
+            self._handles[handle.key] = self._handles.get(handle.key, 0) + 1
+        weakref.finalize(handle, self._release, handle.key)
+        return handle
+
+    def _release(self, key):
+        with self._lock:
+            self._handles[key] -= 1
+            if not self._handles[key]:
+                del self._handles[key]
+
+    def evict_files(self):
+        # Files still referenced by a session handle are never deleted.
+        with self._lock:
+            referenced = {self.filename(key) for key in self._handles}
+            for name in list(self._files):
+                if sum(self._files.values()) <= self.disk_budget:
+                    break
+                if name in referenced:
+                    continue
+                del self._files[name]
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    @property
+    def memory_bytes(self):
+        return self._resident.nbytes + self._pinned.nbytes
+
+    @property
+    def disk_bytes(self):
+        return sum(self._files.values())
+
+
+dataset_store = DatasetStore()
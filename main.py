@@ -1,9 +1,14 @@
 import streamlit as st
-from side_pages.data_loading import main
-from side_pages.data_manipulation import data_manipulation_page
-from side_pages.statistics_1d import statistics_1d_page
-from side_pages.statistics_2d import statistics_2d_page
 from st_pages import show_pages, Page
+from utils import instrumented_rerun, load_page, show_performance_panel, warm_up
+
+# Page modules pull in plotly.express and scipy, so each one is imported when its page is first shown.
+PAGES = {
+    "loading": ('side_pages.data_loading', 'main'),
+    "data_manipulation": ('side_pages.data_manipulation', 'data_manipulation_page'),
+    "statistics_1d": ('side_pages.statistics_1d', 'statistics_1d_page'),
+    "statistics_2d": ('side_pages.statistics_2d', 'statistics_2d_page'),
+}
 
 if "page" not in st.session_state:
     st.session_state['page'] = "loading"
@@ -29,14 +34,10 @@ def switch_page(page: str):
     st.session_state['new_page'] = True
 
 
-if st.session_state['page'] == "loading":
-    main()
-elif st.session_state['page'] == "data_manipulation":
-    show_side_panel()
-    data_manipulation_page()
-elif st.session_state['page'] == "statistics_1d":
-    show_side_panel()
-    statistics_1d_page()
-elif st.session_state['page'] == "statistics_2d":
-    show_side_panel()
-    statistics_2d_page()
+with instrumented_rerun(st.session_state['page']):
+    if st.session_state['page'] != "loading":
+        show_side_panel()
+    load_page(*PAGES[st.session_state['page']])()
+
+show_performance_panel()
+warm_up(module for module, _ in PAGES.values())
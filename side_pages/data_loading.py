@@ -1,13 +1,33 @@
 import streamlit as st
-import pandas as pd
-import re
+from core.backends import Backend
+from core.conversion import build_conversion_plan, convert_dataset
+from core.dtypes import DTYPE_OPTIONS, dtype_option
+from core.edit_history import EditHistory
+from core.ingestion import load_csv, content_hash, parsed_frames
+from core.instrumentation import instrumented, measure
+from utils import data_preview
 
-options = ['int64', 'float64', 'object', 'datetime64[ns]', 'Delete']
+options = DTYPE_OPTIONS + ['Delete']
+
+
+def get_upload_hash(uploaded_file):
+    if st.session_state.get('upload_file_id') != uploaded_file.file_id:
+        st.session_state['upload_file_id'] = uploaded_file.file_id
+        st.session_state['upload_hash'] = content_hash(uploaded_file.getbuffer())
+    return st.session_state['upload_hash']
+
+
+@instrumented
+def show_memory_report(memory_report):
+    total_before = memory_report['Memory Before (MB)'].sum()
+    total_after = memory_report['Memory After (MB)'].sum()
+    st.write("### Memory usage")
+    st.write(f"Total: {total_before:.1f} MB with default types, {total_after:.1f} MB with compact types")
+    st.dataframe(memory_report, use_container_width=True, hide_index=True)
 
 
 def main():
     st.title("CSV File Viewer")
-    st.session_state['edited'] = False
     selected_separator = st.selectbox("Select separator:", [',', ';'],
                                       index=0, placeholder="Select separator",
                                       key='selected_separator')
@@ -16,35 +36,56 @@ def main():
                                     index=0, placeholder="Select decimal",
                                     key='selected_decimal')
 
+    compact_loading = st.checkbox("Memory-bounded loading (reads in chunks and stores columns in compact types)",
+                                  key='compact_loading')
+
     uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
 
     if 'current_page' not in st.session_state:
         st.session_state['current_page'] = 'main'
 
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file, sep=selected_separator, decimal=selected_decimal)
+        with measure('load_csv'):
+            loaded = load_csv(uploaded_file, selected_separator, selected_decimal,
+                              file_hash=get_upload_hash(uploaded_file), compact=compact_loading)
+        df = loaded.df
+
+        if loaded.cache_hit:
+            st.caption(f"Loaded from cache (originally parsed in {loaded.parse_seconds:.2f}s "
+                       f"with the {loaded.engine} engine)")
+        else:
+            st.caption(f"Parsed in {loaded.parse_seconds:.2f}s with the {loaded.engine} engine")
+        st.caption(f"Parse cache: {parsed_frames.hits} hits, {parsed_frames.misses} misses")
+        if isinstance(df, Backend):
+            st.caption("Large file: stored on disk and read one column at a time")
+
+        if loaded.parse_failures:
+            st.warning("Some values did not match their column's type and were loaded as missing: "
+                       + ", ".join(f"{col} ({count:,})" for col, count in loaded.parse_failures.items()))
+
+        if loaded.memory_report is not None:
+            show_memory_report(loaded.memory_report)
 
         st.write("### Raw Data")
-        st.write(df)
-    
-        for col in df.columns:
-            if df.dtypes[col] == "object" and isinstance(df[col][0], str) and re.match(r'((\d{4})[-,\.](\d{2})[-,\.](\d{2})( (\d{2}):(\d{2}):(\d{2}))?)|((\d{2})[-,\.](\d{2})[-,\.](\d{4})( (\d{2}):(\d{2})(:(\d{02}))?)?)', df[col][0].strip()) is not None:
-                    df[col] = df[col].astype('datetime64[ns]')            
-        new_df = df.copy()
+        data_preview(df, loaded.dataset_hash, key='raw_preview')
 
+        # Choices only build a plan here; the conversion itself runs once when leaving the page.
+        conversion_plans = st.session_state.setdefault('conversion_plans', {})
+        saved_plan = conversion_plans.get(loaded.dataset_hash, {})
+        choices = {}
         for col in df.columns:
-                        
-            new_dtype = st.selectbox(f"Select data type for column '{col}'", options=options,
-                                     index=options.index(f'{df.dtypes[col]}'))
-            if new_dtype != df.dtypes[col]:
-                if new_dtype != 'Delete':
-                    new_df[col] = df[col].astype(new_dtype)
-                else:
-                    new_df = new_df.drop([col], axis=1)
+            choice = saved_plan.get(col, dtype_option(df.dtypes[col]))
+            choices[col] = st.selectbox(f"Select data type for column '{col}'", options=options,
+                                        index=options.index(choice))
+        plan = build_conversion_plan(df.dtypes, choices)
+        conversion_plans[loaded.dataset_hash] = plan
+        if plan:
+            st.caption(f"{len(plan)} column change(s) will be applied when you go to data analysis")
 
         def click():
-            st.session_state['primary_df'] = new_df
-            st.session_state['edited'] = False
+            new_df, report, dataset_hash = convert_dataset(df, loaded.dataset_hash, plan)
+            st.session_state['history'] = EditHistory(new_df, dataset_hash)
+            st.session_state['conversion_report'] = report
             st.session_state['new_page'] = True
             st.session_state['page'] = 'data_manipulation'
 
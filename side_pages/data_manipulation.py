@@ -1,56 +1,43 @@
-import pandas as pd
 import streamlit as st
-from utils import scroll_to_top
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES, DATETIME_DTYPES
+from core.instrumentation import instrumented, measure
+from core.edit_history import fill_operation, impute_operation, rename_operation, describe_operation
+from core.imputation import BATCH_STRATEGY_GROUPS, REPLACE_EMPTY_STRATEGIES, build_imputation_plan, custom_fill_value
+from core.profiling import get_missing_values
+from utils import data_preview, export_button, scroll_to_top
 
-REPLACE_EMPTY_STRATEGIES = {
-    "object": ["Most Frequent", "Custom Value", "Drop Rows"],
-    "datetime64[ns]": ["Custom Value", "Drop Rows"],
-    "float64": ["Mean", "Median", "Most Frequent", "Zero", "Forward Fill", "Backward Fill", "Interpolation",
-                "Custom Value", "Drop Rows"],
-    "int64": ["Mean", "Median", "Most Frequent", "Zero", "Forward Fill", "Backward Fill", "Interpolation",
-              "Custom Value", "Drop Rows"]
-}
 
-
-def generate_empty(df, selected_variable):
+def generate_empty(df, selected_variable, missing_counts=None):
+    if missing_counts is not None:
+        return missing_counts[selected_variable]
     empty_values_count = df[selected_variable].isnull().sum()
     return empty_values_count
 
 
-def replace_empty_values(df, selected_variable, method):
-    df = df.copy()
-    if method == "Most Frequent":
-        most_frequent_value = df[selected_variable].mode()[0]
-        df[selected_variable].fillna(most_frequent_value,inplace=True)
-    if method == "Custom Value":
-        df[selected_variable].fillna(st.session_state['custom_value'],inplace=True)
-    if method == "Mean":
-        df[selected_variable].fillna(df[selected_variable].mean(),inplace=True)
-    if method == "Median":
-        df[selected_variable].fillna(df[selected_variable].median(),inplace=True)
-    if method == "Zero":
-        df[selected_variable].fillna(0,inplace=True)
-    if method == "Forward Fill":
-        df[selected_variable].fillna(method='ffill',inplace=True)
-    if method == "Backward Fill":
-        df[selected_variable].fillna(method='bfill',inplace=True)
-    if method == "Interpolation":
-        df[selected_variable].interpolate(inplace=True)
-    if method == "Drop Rows":
-        df.dropna(subset=[selected_variable],inplace=True)
-    return df
-
-
-def get_missing_values(df):
-    missing_values_count = df.isnull().sum()
-    missing_values_df = missing_values_count[missing_values_count > 0]
-    result_df = pd.DataFrame({'Column Name': missing_values_df.index, 'Missing Values Count': missing_values_df.values})
-    return result_df
-
-
-@st.cache_data
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
+def batch_strategies(dtypes):
+    # Custom values are typed per column, so batch filling only offers the computed strategies.
+    return [method for method in REPLACE_EMPTY_STRATEGIES[dtypes[0]] if method != "Custom Value"]
+
+
+@instrumented
+def show_missing_patterns(profile):
+    with st.expander("Missing data patterns"):
+        st.write("Rows missing both variables")
+        st.dataframe(profile.co_missingness(), use_container_width=True)
+        st.write(f"Most common combinations of missing variables ({profile.pattern_count} in total)")
+        st.dataframe(profile.row_patterns(), use_container_width=True, hide_index=True)
+
+
+@instrumented
+def show_conversion_report():
+    report = st.session_state.get('conversion_report')
+    if report is None or report.empty:
+        return
+    problems = report[(report['Failed Values'] > 0) | report['Error'].notna()]
+    with st.expander("Type conversion report", expanded=not problems.empty):
+        if problems.empty:
+            st.write(f"Converted {len(report)} column(s) without errors")
+        st.dataframe(report, use_container_width=True, hide_index=True)
 
 
 def data_manipulation_page():
@@ -60,36 +47,33 @@ def data_manipulation_page():
     def change_reset_state(state: bool):
         st.session_state['reset_confirmation'] = state
 
+    history = st.session_state['history']
+
     def reset_edited_state():
-        st.session_state['edited'] = False
-        st.session_state['edited_df'] = st.session_state['primary_df']
+        history.reset()
         change_reset_state(False)
         st.toast("Dataset set to initial values")
 
-    def change_primary_df(df):
-        st.session_state['primary_df'] = df
+    def replace_values_batch(plan):
+        history.apply(impute_operation(plan))
+        del st.session_state['batch_columns']
 
-    def change_edited_df(df):
-        st.session_state['edited_df'] = df
-
-    def replace_values(df, selected_variable, method):
-        edited_df = replace_empty_values(df, selected_variable, method)
-        st.session_state['edited_df'] = edited_df
-        st.session_state['edited'] = True
+    def replace_values(selected_variable, method, custom_value=None):
+        history.apply(fill_operation(selected_variable, method, custom_value))
         del st.session_state['empty_selected']
         st.session_state['empty_selected'] = None
 
     st.write("# Data Manipulation")
-    if not st.session_state['edited']:
-        df = st.session_state['primary_df']
-    else:
-        df = st.session_state['edited_df']
+    show_conversion_report()
+    df = history.current
 
     all_variables = df.columns.tolist()
-    all_variables_with_empty_values = df.columns[df.isnull().any()].tolist()
+    missing_profile = history.missing_profile()
+    missing_counts = missing_profile.counts
+    all_variables_with_empty_values = missing_counts[missing_counts > 0].index.tolist()
 
     st.write(f"### Data preview")
-    st.write(df)
+    data_preview(df, history.version, key='data_preview')
 
     st.write(f"### Change variable name")
     selected_variable = st.selectbox("Select variable to change:", df.columns,
@@ -99,9 +83,7 @@ def data_manipulation_page():
     if selected_variable:
         changed_value = st.text_input(f"Rename '{selected_variable}' to:", value=selected_variable)
         if changed_value != selected_variable:
-            df_editable = df.rename(columns={selected_variable: changed_value})
-            change_primary_df(df_editable)
-            change_edited_df(df_editable)
+            history.apply(rename_operation(selected_variable, changed_value))
             st.rerun()
 
     st.write(f"### Replace missing data")
@@ -109,13 +91,14 @@ def data_manipulation_page():
     if len(all_variables_with_empty_values) == 0:
         st.write("No columns with missing data")
     else:
-        st.write(get_missing_values(df))
+        st.write(get_missing_values(df, missing_counts))
+        show_missing_patterns(missing_profile)
         selected_variable_fill = st.selectbox(f"Select variable to replace empty values",
                                               options=all_variables_with_empty_values,
                                               index=None, placeholder="Select variable", key="empty_selected")
 
         if selected_variable_fill is not None:
-            empty_values_count = generate_empty(df, selected_variable_fill)
+            empty_values_count = generate_empty(df, selected_variable_fill, missing_counts)
             st.write(f"Number of empty values for {selected_variable_fill}: {empty_values_count}")
 
             method = st.selectbox("Select method to replace empty values:",
@@ -123,25 +106,41 @@ def data_manipulation_page():
                                   placeholder="Select method")
 
             if method != "Custom Value":
-                st.button("Replace Empty Values", on_click=replace_values, args=[df, selected_variable_fill, method])
+                st.button("Replace Empty Values", on_click=replace_values, args=[selected_variable_fill, method])
             else:
                 custom_value = st.text_input("Enter custom value", key="custom_value")
                 if custom_value:
-                    replace_values(df, selected_variable_fill, method)
-                    st.rerun()
+                    try:
+                        custom_value = custom_fill_value(df[selected_variable_fill], custom_value)
+                    except ValueError:
+                        st.error(f"{custom_value!r} is not a valid {df[selected_variable_fill].dtype} value")
+                    else:
+                        replace_values(selected_variable_fill, method, custom_value)
+                        st.rerun()
+
+        st.write(f"#### Replace missing data in many columns")
+        batch_columns = st.multiselect("Select variables to fill", all_variables_with_empty_values,
+                                       default=all_variables_with_empty_values, key="batch_columns")
+        strategies = {}
+        strategy_columns = st.columns(len(BATCH_STRATEGY_GROUPS))
+        for strategy_column, (group, dtypes) in zip(strategy_columns, BATCH_STRATEGY_GROUPS.items()):
+            with strategy_column:
+                strategies[group] = st.selectbox(f"Method for {group} variables", batch_strategies(dtypes),
+                                                 index=None, placeholder="Leave unchanged",
+                                                 key=f"batch_strategy_{group}")
+        plan = build_imputation_plan(df, batch_columns, strategies)
+        st.button(f"Replace Empty Values in {len(plan)} variables", on_click=replace_values_batch, args=[plan],
+                  disabled=not plan)
 
     st.write(f"### Save dataset")
-    if st.button('Save DataFrame to CSV' , key="save_all"):
-        filename = st.text_input('Enter a filename for the CSV file:', 'data.csv')
-        csv = convert_df_to_csv(df)
-        st.download_button(label='Click to download CSV file',
-                           data=csv, file_name=filename, mime='text/csv', key="download_all")
+    export_button('Save DataFrame', df, history.version, key="save_all")
 
     st.write(f"### Save dataset with selected columns")
     all_variables = df.columns.tolist()
-    all_categorical_variables = df.select_dtypes(include=['object']).columns.tolist()
-    all_datetime_variables = df.select_dtypes(include=['datetime64[ns]']).columns.tolist()
-    all_numerical_variables = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    with measure('select_dtypes'):
+        all_categorical_variables = df.select_dtypes(include=CATEGORICAL_DTYPES).columns.tolist()
+        all_datetime_variables = df.select_dtypes(include=DATETIME_DTYPES).columns.tolist()
+        all_numerical_variables = df.select_dtypes(include=NUMERICAL_DTYPES).columns.tolist()
     col1, col2, col3, col4 = st.columns([0.15, 0.25, 0.25, 0.25])
     with col1:
         select_all = st.button("Select All")
@@ -168,12 +167,20 @@ def data_manipulation_page():
     elif select_all_date:
         overwrite_selected_variables(all_datetime_variables)
 
-    if st.button('Save DataFrame to CSV', key="save_selected"):
-        new_df = df.loc[:, selected_variables]
-        filename = st.text_input('Enter a filename for the CSV file:', 'data.csv')
-        csv = convert_df_to_csv(new_df)
-        st.download_button(label='Click to download CSV file',
-                           data=csv, file_name=filename, mime='text/csv', key="download_selected")
+    export_button('Save DataFrame', df, history.version, key="save_selected", columns=selected_variables)
+
+    st.write(f"### Edit history")
+    if history.operations:
+        for index, operation in enumerate(history.operations):
+            marker = "" if index < history.position else " (undone)"
+            st.write(f"{index + 1}. {describe_operation(operation)}{marker}")
+    else:
+        st.write("No edits yet")
+    col1, col2 = st.columns([0.1, 0.9])
+    with col1:
+        st.button("Undo", on_click=history.undo, disabled=not history.can_undo)
+    with col2:
+        st.button("Redo", on_click=history.redo, disabled=not history.can_redo)
 
     st.write(f"### Reset dataset to initial values")
     if not st.session_state['reset_confirmation']:
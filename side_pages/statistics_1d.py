@@ -1,103 +1,125 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
-from utils import scroll_to_top
-from side_pages.data_manipulation import convert_df_to_csv
+import plotly.graph_objects as go
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES, DATETIME_DTYPES, columns_of_dtypes
+from core.instrumentation import instrumented, measure
+from core.profiling import column_profile, statistics_table
+from core.plot_aggregates import (MAX_CATEGORIES, box_statistics, cached_aggregate, compute_plot_aggregates,
+                                  histogram_bins, sketch_box_statistics, sketch_histogram, top_value_counts)
+from core.sketches import HLL_PRECISION, KLL_K, column_sketch, hll_relative_error, kll_rank_error
+from utils import export_button, refresh_while_jobs_run, run_job, scroll_to_top
+
+
+def value_count_figures(var, counts, total=None, distinct=None):
+    value_counts = top_value_counts(counts, total=total, distinct=distinct)
+    bar = px.bar(value_counts, x='value', y='count',
+                 labels={'value': var, 'count': 'Frequency'}, title=f"{var} Bar Chart")
+    pie = px.pie(value_counts, values='count', names='value', title=f"{var} Pie Chart")
+    tree = px.treemap(value_counts, path=['value'], values='count')
+    tree.update_layout(title='Treemap of Unique Values Counts in Column')
+    return bar, pie, tree
+
+
+def histogram_figure(var, histogram):
+    hist = px.bar(histogram, x='center', y='count', hover_data=['start', 'end'],
+                  labels={'center': var, 'count': 'count'}, title=f"{var} Histogram")
+    widths = histogram['end'] - histogram['start']
+    if widths.dtype == 'timedelta64[ns]':
+        # Plotly measures bar widths on date axes in milliseconds.
+        widths = widths.dt.total_seconds() * 1000
+    hist.update_traces(width=widths.tolist())
+    hist.update_layout(bargap=0)
+    return hist
+
+
+def box_figure(var, box_stats):
+    box = go.Figure(go.Box(name=var, q1=[box_stats['q1']], median=[box_stats['median']], q3=[box_stats['q3']],
+                           mean=[box_stats['mean']], lowerfence=[box_stats['lowerfence']],
+                           upperfence=[box_stats['upperfence']], boxpoints=False))
+    box.update_layout(title=f"{var} Box Plot ({box_stats['outliers']} values outside the whiskers)", yaxis_title=var)
+    return box
+
+
+def generate_approximate_plots(df, var, version=None):
+    sketch = column_sketch(df, var, version)
+    if sketch.kind == 'categorical':
+        profile = column_profile(df, var, version, approximate=True)
+        if profile['Distinct'] > MAX_CATEGORIES:
+            st.caption(f"Showing the {MAX_CATEGORIES} most frequent of about {profile['Distinct']:,} values, "
+                       f"the rest are grouped together")
+        bar, pie, tree = value_count_figures(var, profile['Counts'], sketch.frequent.count, profile['Distinct'])
+
+        col1_1, col2_1 = st.columns(2)
+        col1_2, col2_2 = st.columns(2)
+
+        col1_1.plotly_chart(bar, use_container_width=True)
+        col2_1.plotly_chart(pie, use_container_width=True)
+        col1_2.plotly_chart(tree, use_container_width=True)
+    elif sketch.kind == 'numeric':
+        box_stats = sketch_box_statistics(sketch)
+        if box_stats is None:
+            st.write("No values to plot")
+            return
+        col1, col2 = st.columns(2)
+        col1.plotly_chart(histogram_figure(var, sketch_histogram(sketch)), use_container_width=True)
+        col2.plotly_chart(box_figure(var, box_stats), use_container_width=True)
+    else:
+        st.plotly_chart(histogram_figure(var, sketch_histogram(sketch)))
 
 
-def generate_statistics(df, selected_variables):
-    statistics = {}
-    num = 1
-    for var in selected_variables:
-        if df[var].dtype == 'int64' or df[var].dtype == 'float64':
-            statistics[num] = {
-                'Variable': var,
-                'Mean': df[var].mean(),
-                'Median': df[var].median(),
-                'Std Dev': df[var].std(),
-                'Min': df[var].min(),
-                'Max': df[var].max(),
-            }
-            num += 1
-        elif df[var].dtype == 'object':
-            unique_values = df[var].value_counts()
-            total_count = len(df[var])
-            for value, count in unique_values.items():
-                stats = {
-                    'Variable': var,
-                    'Value': value,
-                    'Count': count,
-                    'Count Percentage': (count / total_count) * 100
-                }
-                statistics[num] = stats
-                num += 1
-        elif df[var].dtype == 'datetime64[ns]':
-            statistics[num] = {
-                'Variable': var,
-                'Earliest Date': df[var].min(),
-                'Latest Date': df[var].max(),
-            }
-            num += 1
-
-    statistics_df = pd.DataFrame(statistics).transpose()
-    return statistics_df
-
-
-def generate_1d_plots(df, selected_variables):
+@instrumented
+def generate_1d_plots(df, selected_variables, version=None, approximate=False):
+    # Figures are built from server-side aggregates so the payload depends on bins, not rows.
     for var in selected_variables:
         st.title(var)
-        if df[var].dtype == 'object':
-            unique_value = df[var].unique()
-            if len(unique_value) > 50:
-                show_all = st.checkbox("Variable have more than 40 unique values, are you sure, that you want to "
-                                       "generate plots ? It can slow the app significantly.", value=False, key=f"checkbox_{var}")
-            else:
-                show_all = True
-
-            if show_all:
-                filtered_df = df
-                bar = px.bar(filtered_df[var].value_counts(), x=filtered_df[var].value_counts().index,
-                             y=filtered_df[var].value_counts().values,
-                             labels={'x': var, 'y': 'Frequency'}, title=f"{var} Bar Chart")
-                pie = px.pie(df[var].value_counts(), values=df[var].value_counts().values,
-                             names=df[var].value_counts().index,
-                             title=f"{var} Pie Chart")
-                value_counts = df[var].value_counts().reset_index()
-                value_counts.columns = ['value', 'count']
-                tree = px.treemap(value_counts, path=['value'], values='count')
-                tree.update_layout(title='Treemap of Unique Values Counts in Column')
-
-                col1_1, col2_1 = st.columns(2)
-                col1_2, col2_2 = st.columns(2)
-
-                col1_1.plotly_chart(bar, use_container_width=True)
-                col2_1.plotly_chart(pie, use_container_width=True)
-                col1_2.plotly_chart(tree, use_container_width=True)
-
-        elif df[var].dtype == 'int64' or df[var].dtype == 'float':
-
-            hist = px.histogram(df, x=var, title=f"{var} Histogram")
-            box = px.box(df, y=var, title=f"{var} Box Plot")
+        if approximate:
+            generate_approximate_plots(df, var, version)
+
+        elif df[var].dtype in CATEGORICAL_DTYPES:
+            counts = column_profile(df, var, version)['Counts']
+            if len(counts) > MAX_CATEGORIES:
+                st.caption(f"Showing the {MAX_CATEGORIES} most frequent of {len(counts)} values, "
+                           f"the rest are grouped together")
+            bar, pie, tree = value_count_figures(var, counts)
+
+            col1_1, col2_1 = st.columns(2)
+            col1_2, col2_2 = st.columns(2)
+
+            col1_1.plotly_chart(bar, use_container_width=True)
+            col2_1.plotly_chart(pie, use_container_width=True)
+            col1_2.plotly_chart(tree, use_container_width=True)
+
+        elif df[var].dtype in NUMERICAL_DTYPES:
+            histogram = cached_aggregate('histogram', histogram_bins, df, var, version)
+            box_stats = cached_aggregate('box', box_statistics, df, var, version)
+            if box_stats is None:
+                st.write("No values to plot")
+                continue
 
             col1, col2 = st.columns(2)
 
-            col1.plotly_chart(hist, use_container_width=True)
-            col2.plotly_chart(box, use_container_width=True)
+            col1.plotly_chart(histogram_figure(var, histogram), use_container_width=True)
+            col2.plotly_chart(box_figure(var, box_stats), use_container_width=True)
+
+        elif df[var].dtype in DATETIME_DTYPES:
+            histogram = cached_aggregate('histogram', histogram_bins, df, var, version)
+            st.plotly_chart(histogram_figure(var, histogram))
 
         else:
-            fig = px.histogram(df, x=var, title=f"{var} Histogram")
-            st.plotly_chart(fig)
+            counts = cached_aggregate('counts', lambda series: series.value_counts(), df, var, version)
+            st.plotly_chart(value_count_figures(var, counts)[0])
 
 
 def statistics_1d_page():
-    if not st.session_state['edited']:
-        df = st.session_state['primary_df']
-    else:
-        df = st.session_state['edited_df']
-    all_variables = df.columns.tolist()
-    all_categorical_variables = df.select_dtypes(include=['object']).columns.tolist()
-    all_datetime_variables = df.select_dtypes(include=['datetime64[ns]']).columns.tolist()
-    all_numerical_variables = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    history = st.session_state['history']
+    # Large unedited datasets are read column by column from the store's file, so the whole frame is only
+    # loaded when the pandas backend is chosen.
+    data = history.backend()
+    all_variables = data.columns.tolist()
+    with measure('select_dtypes'):
+        all_categorical_variables = columns_of_dtypes(data.dtypes, CATEGORICAL_DTYPES)
+        all_datetime_variables = columns_of_dtypes(data.dtypes, DATETIME_DTYPES)
+        all_numerical_variables = columns_of_dtypes(data.dtypes, NUMERICAL_DTYPES)
 
     st.write("### 1D Statistics")
     col1, col2, col3, col4 = st.columns([0.15, 0.25, 0.25, 0.25])
@@ -111,6 +133,8 @@ def statistics_1d_page():
         select_all_date = st.button("Select All Date")
 
     selected_variables = st.multiselect("Select variables", all_variables, key="selected_variables")
+    approximate = st.checkbox("Approximate statistics (one pass with bounded memory, for very large columns)",
+                              key="approximate_1d")
 
     def overwrite_selected_variables(new_variables):
         del st.session_state['selected_variables']
@@ -127,18 +151,26 @@ def statistics_1d_page():
         overwrite_selected_variables(all_datetime_variables)
 
     if selected_variables:
-        stats_df = generate_statistics(df, selected_variables)
-
-        st.write("Variable Statistics")
-        st.write(stats_df)
-
-        if st.button("Save Statistics to CSV"):
-            filename = st.text_input('Enter a filename for the CSV file:', 'data.csv')
-            csv = convert_df_to_csv(df)
-            st.download_button(label='Click to download CSV file',
-                               data=csv, file_name=filename, mime='text/csv')
-
-        generate_1d_plots(df, selected_variables)
+        key = (history.version, tuple(selected_variables), approximate)
+        stats_df = run_job(('stats_1d', *key), "Statistics", statistics_table,
+                           data, selected_variables, history.version, approximate=approximate)
+        if stats_df is not None:
+            st.write("Variable Statistics")
+            if approximate:
+                st.caption(f"Medians are within {kll_rank_error(KLL_K):.2%} of the rows of the true median, "
+                           f"distinct counts have a {hll_relative_error(HLL_PRECISION):.2%} standard error, "
+                           f"and value counts are low by at most their Count Error.")
+            st.write(stats_df)
+
+            # Statistics mix value types within a column, which only the CSV writer accepts.
+            export_button("Save Statistics", stats_df, ('stats_1d', *key), key="save_statistics",
+                          formats=['CSV'])
+
+        if run_job(('plots_1d', *key), "Plots", compute_plot_aggregates, data, selected_variables, history.version,
+                   approximate=approximate):
+            generate_1d_plots(data, selected_variables, history.version, approximate)
 
     if st.session_state['new_page']:
-        scroll_to_top()
\ No newline at end of file
+        scroll_to_top()
+
+    refresh_while_jobs_run()
\ No newline at end of file
@@ -1,71 +1,80 @@
 import streamlit as st
 import plotly.express as px
-from utils import scroll_to_top
+import plotly.graph_objects as go
+import numpy as np
+from utils import refresh_while_jobs_run, run_job, scroll_to_top
 import pandas as pd
-from scipy.stats import chi2_contingency, kruskal
+from core.association import cramers_v_matrix
+from core.bivariate import association_statistics, split_variables
+from core.correlation import CORRELATION_METHODS, strongest_pairs
+from core.dtypes import NUMERICAL_DTYPES, CATEGORICAL_DTYPES, DATETIME_DTYPES, columns_of_dtypes
+from core.instrumentation import instrumented, measure
+from core.plot_aggregates import (DEFAULT_POINT_BUDGET, category_density_grid, density_grid, grouped_box_statistics,
+                                  render_strategy, sample_rows)
 
+MAX_MATRIX_COLUMNS = 50
+MAX_ANNOTATED_COLUMNS = 20
 
-def generate_statistics(df, selected_variables):
+
+@instrumented
+def generate_statistics(df, selected_variables, version=None):
     if len(selected_variables) == 0: return
-    sel_categorical = []
-    sel_numerical = []
-    for var in selected_variables:
-        if df[var].dtype == 'object':
-            sel_categorical.append(var)
-        elif df[var].dtype in ['int64', 'float64']:
-            sel_numerical.append(var)
+    sel_numerical, sel_categorical = split_variables(df, selected_variables)
 
+    method = CORRELATION_METHODS[0]
     if len(sel_numerical) > 1:
-        corr = df.loc[:, sel_numerical].corr()
-        fig = px.imshow(corr,
-                        text_auto=True,
-                        aspect="auto",
-                        color_continuous_scale='RdBu_r',
-                        labels=dict(color="Correlation"),
-                        )
-        fig.update_layout(coloraxis_colorbar=dict(title="Correlation", tickvals=[-1, -0.5, 0, 0.5, 1]),
-                          title_text='Correlation Matrix')
-        st.plotly_chart(fig, theme="streamlit")
-
-    if len(sel_categorical) > 1:
-        results = []
-        for i, var1 in enumerate(sel_categorical):
-            for var2 in sel_categorical[i + 1:]:
-                contingency_table = pd.crosstab(df[var1], df[var2])
-                chi2, p, dof, _ = chi2_contingency(contingency_table)
-                results.append({
-                    'Variable 1': var1,
-                    'Variable 2': var2,
-                    'Chi-Square Statistic': chi2,
-                    'p-value': p,
-                    'Degrees of Freedom': dof
-                })
-        results_df = pd.DataFrame(results)
-        st.dataframe(results_df, use_container_width=True, hide_index=True)
-
-    if len(sel_categorical) > 1 and len(sel_numerical) > 0:
-        results = []
-        for numerical in sel_numerical:
-            for categorical in sel_categorical:
-                groups = df.groupby(categorical)[numerical].apply(list)
-                stat, p_value = kruskal(*groups)
-                results.append({
-                    'Variable 1': numerical,
-                    'Variable 2': categorical,
-                    'Test Type': 'Kruskal-Wallis',
-                    'Statistic': stat,
-                    'p-value': p_value,
-                    'Degrees of Freedom': len(groups) - 1
-                })
-
-        results_df = pd.DataFrame(results)
+        col1, col2 = st.columns(2)
+        with col1:
+            method = st.selectbox("Correlation method", CORRELATION_METHODS, index=0, key="correlation_method")
+        with col2:
+            views = ["Matrix", "Strongest pairs"]
+            view = st.radio("Correlation view", views, index=0 if len(sel_numerical) <= MAX_MATRIX_COLUMNS else 1,
+                            horizontal=True, key="correlation_view")
+
+    key = ('stats_2d', version, tuple(selected_variables), method)
+    results = run_job(key, "2D statistics", association_statistics, df, selected_variables, version, method)
+    if results is None:
+        return
+
+    if 'correlation' in results:
+        corr = results['correlation']
+        if view == "Matrix":
+            fig = px.imshow(corr,
+                            text_auto=len(sel_numerical) <= MAX_ANNOTATED_COLUMNS,
+                            aspect="auto",
+                            zmin=-1, zmax=1,
+                            color_continuous_scale='RdBu_r',
+                            labels=dict(color="Correlation"),
+                            )
+            fig.update_layout(coloraxis_colorbar=dict(title="Correlation", tickvals=[-1, -0.5, 0, 0.5, 1]),
+                              title_text='Correlation Matrix')
+            st.plotly_chart(fig, theme="streamlit")
+        else:
+            top_k = st.number_input("Number of pairs", min_value=1, max_value=1000, value=20, key="correlation_top_k")
+            st.dataframe(strongest_pairs(corr, top_k), use_container_width=True, hide_index=True)
+
+    if 'chi_square' in results:
+        results_df = results['chi_square']
         st.dataframe(results_df, use_container_width=True, hide_index=True)
+        if st.checkbox("Show Cramér's V matrix", key="show_cramers_v"):
+            fig = px.imshow(cramers_v_matrix(results_df, sel_categorical),
+                            text_auto=len(sel_categorical) <= 20,
+                            aspect="auto",
+                            zmin=0, zmax=1,
+                            color_continuous_scale='Blues',
+                            labels=dict(color="Cramér's V"),
+                            )
+            fig.update_layout(title_text="Cramér's V Matrix")
+            st.plotly_chart(fig, theme="streamlit")
+
+    if 'kruskal' in results:
+        st.dataframe(results['kruskal'], use_container_width=True, hide_index=True)
     return
 
 
 def plot_categorical_categorical(df, xs, ys):
     if xs == ys: return
-    grouped_df = df.groupby([xs, ys]).size().reset_index(name='count')
+    grouped_df = df.groupby([xs, ys], observed=True).size().reset_index(name='count')
 
     fig = px.bar(grouped_df, x=xs, y='count', color=ys, title=f'Stacked Bar Chart of {xs} by {ys}', barmode='stack')
     st.plotly_chart(fig, use_container_width=True)
@@ -74,47 +83,103 @@ def plot_categorical_categorical(df, xs, ys):
     st.plotly_chart(fig, use_container_width=True)
 
 
-def plot_numerical_numerical(df, xs, ys):
-    fig = px.scatter(df, x=xs, y=ys, title=f"Scatter plot of {xs} vs {ys}")
-    st.plotly_chart(fig, use_container_width=True)
+def density_figure(x, y, counts, title):
+    fig = go.Figure(go.Heatmap(x=x, y=y, z=counts, colorscale='Viridis', colorbar=dict(title="count")))
+    fig.update_layout(title=title)
+    return fig
+
+
+def show_sampling_caption(strategy, shown, total):
+    if strategy == 'sample':
+        st.caption(f"Showing {shown:,} of {total:,} points")
+    elif strategy == 'density':
+        st.caption(f"{total:,} rows are drawn as a binned density image")
 
-    fig = px.density_heatmap(df, x=xs, y=ys, title=f"Heatmap of {xs} vs {ys}")
-    st.plotly_chart(fig, use_container_width=True)
 
+def plot_numerical_numerical(df, xs, ys, point_budget=DEFAULT_POINT_BUDGET):
+    strategy = render_strategy(len(df), point_budget)
+    if strategy != 'density':
+        data = sample_rows(df, list(dict.fromkeys([xs, ys])), point_budget)
+        show_sampling_caption(strategy, len(data), len(df))
+        fig = px.scatter(data, x=xs, y=ys, title=f"Scatter plot of {xs} vs {ys}",
+                         render_mode='svg' if strategy == 'svg' else 'webgl')
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        show_sampling_caption(strategy, 0, len(df))
 
-def plot_categorical_numerical(df, categorical, numerical):
-    fig = px.strip(df, x=categorical, y=numerical, title=f"Strip plot of {categorical} vs {numerical}")
+    x, y, counts = density_grid(df, xs, ys)
+    fig = density_figure(x, y, counts, f"Heatmap of {xs} vs {ys}")
+    fig.update_layout(xaxis_title=xs, yaxis_title=ys)
     st.plotly_chart(fig, use_container_width=True)
 
-    fig = px.box(df, x=categorical, y=numerical, title=f"Box plot of {categorical} vs {numerical}")
+
+def jittered_strip_figure(data, categorical, numerical, title):
+    codes, categories = pd.factorize(data[categorical], sort=True)
+    positions = codes + np.random.default_rng(0).uniform(-0.35, 0.35, len(codes))
+    fig = px.scatter(x=positions, y=data[numerical], render_mode='webgl', title=title,
+                     labels={'x': categorical, 'y': numerical})
+    fig.update_xaxes(tickvals=list(range(len(categories))), ticktext=categories.astype(str).tolist())
+    return fig
+
+
+def grouped_box_figure(df, categorical, numerical):
+    fig = go.Figure()
+    for category, stats in grouped_box_statistics(df, categorical, numerical).items():
+        fig.add_trace(go.Box(name=category, q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+                             mean=[stats['mean']], lowerfence=[stats['lowerfence']],
+                             upperfence=[stats['upperfence']], boxpoints=False))
+    fig.update_layout(title=f"Box plot of {categorical} vs {numerical}", xaxis_title=categorical,
+                      yaxis_title=numerical, showlegend=False)
+    return fig
+
+
+def plot_categorical_numerical(df, categorical, numerical, point_budget=DEFAULT_POINT_BUDGET):
+    strategy = render_strategy(len(df), point_budget)
+    title = f"Strip plot of {categorical} vs {numerical}"
+    if strategy == 'density':
+        show_sampling_caption(strategy, 0, len(df))
+        categories, y, counts = category_density_grid(df, categorical, numerical)
+        fig = density_figure(categories, y, counts, title)
+        fig.update_layout(xaxis_title=categorical, yaxis_title=numerical)
+    else:
+        data = sample_rows(df, [categorical, numerical], point_budget, stratify=categorical)
+        show_sampling_caption(strategy, len(data), len(df))
+        if strategy == 'svg':
+            fig = px.strip(data, x=categorical, y=numerical, title=title)
+        else:
+            fig = jittered_strip_figure(data, categorical, numerical, title)
     st.plotly_chart(fig, use_container_width=True)
 
+    st.plotly_chart(grouped_box_figure(df, categorical, numerical), use_container_width=True)
+
 
-def generate_2d_plots(df, selected_variables):
+@instrumented
+def generate_2d_plots(df, selected_variables, point_budget=DEFAULT_POINT_BUDGET):
     xs, ys = selected_variables
 
-    x_type = "categorical" if df[xs].dtype == "object" else "numerical"
-    y_type = "categorical" if df[ys].dtype == "object" else "numerical"
+    x_type = "categorical" if df[xs].dtype in CATEGORICAL_DTYPES else "numerical"
+    y_type = "categorical" if df[ys].dtype in CATEGORICAL_DTYPES else "numerical"
 
     if x_type == "categorical" and y_type == "categorical":
         plot_categorical_categorical(df, xs, ys)
     elif x_type == "numerical" and y_type == "numerical":
-        plot_numerical_numerical(df, xs, ys)
+        plot_numerical_numerical(df, xs, ys, point_budget)
     elif x_type == "numerical" and y_type == "categorical":
-        plot_categorical_numerical(df, categorical=ys, numerical=xs)
+        plot_categorical_numerical(df, categorical=ys, numerical=xs, point_budget=point_budget)
     else:
-        plot_categorical_numerical(df, categorical=xs, numerical=ys)
+        plot_categorical_numerical(df, categorical=xs, numerical=ys, point_budget=point_budget)
 
 
 def statistics_2d_page():
-    if not st.session_state['edited']:
-        df = st.session_state['primary_df']
-    else:
-        df = st.session_state['edited_df']
-    all_variables = df.columns.tolist()
-    all_categorical_variables = df.select_dtypes(include=['object']).columns.tolist()
-    all_datetime_variables = df.select_dtypes(include=['datetime64[ns]']).columns.tolist()
-    all_numerical_variables = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    history = st.session_state['history']
+    # Large unedited datasets are read column by column from the store's file, so the whole frame is only
+    # loaded when the pandas backend is chosen.
+    data = history.backend()
+    all_variables = data.columns.tolist()
+    with measure('select_dtypes'):
+        all_categorical_variables = columns_of_dtypes(data.dtypes, CATEGORICAL_DTYPES)
+        all_datetime_variables = columns_of_dtypes(data.dtypes, DATETIME_DTYPES)
+        all_numerical_variables = columns_of_dtypes(data.dtypes, NUMERICAL_DTYPES)
 
     st.write("### 2D Statistics")
     col1, col2, col3, col4 = st.columns([0.15, 0.25, 0.25, 0.25])
@@ -144,7 +209,7 @@ def statistics_2d_page():
         overwrite_selected_variables(all_datetime_variables)
 
     if selected_variables:
-        generate_statistics(df, selected_variables)
+        generate_statistics(data, selected_variables, history.version)
 
     st.write("### 2D plots")
     selected_variable_plot_a = st.selectbox(f"Select first variable to plot", options=all_variables,
@@ -152,8 +217,14 @@ def statistics_2d_page():
     selected_variable_plot_b = st.selectbox(f"Select second variable to plot", options=all_variables,
                                             index=None, key="b")
 
+    point_budget = st.number_input("Maximum number of points to draw", min_value=1000, max_value=1_000_000,
+                                   value=DEFAULT_POINT_BUDGET, step=10_000, key="point_budget")
+
     if selected_variable_plot_a and selected_variable_plot_b:
-        generate_2d_plots(df, [selected_variable_plot_a, selected_variable_plot_b])
+        plot_variables = [selected_variable_plot_a, selected_variable_plot_b]
+        generate_2d_plots(data.frame(plot_variables), plot_variables, point_budget)
 
     if st.session_state['new_page']:
         scroll_to_top()
+
+    refresh_while_jobs_run()
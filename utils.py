@@ -1,4 +1,21 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from core.export import EXPORT_FORMATS, MIME_TYPES, export_dataset, file_extension
+from core.instrumentation import instrumented, measure, record_job, record_rerun
+from core.jobs import job_manager
+from core.preview import DEFAULT_PAGE_SIZE, PAGE_SIZES, preview_window
+
+JOB_POLL_SECONDS = 0.5
+
+_warm_up_lock = threading.Lock()
+_warm_up_started = False
 
 
 def scroll_to_top():
@@ -12,3 +29,165 @@ def scroll_to_top():
     '''
     st.components.v1.html(js, height=0)
     st.session_state['new_page'] = False
+
+
+def run_job(key, label, function, *args, **kwargs):
+    job = job_manager.submit(key, function, *args, **kwargs)
+    if job.status == 'running':
+        st.progress(job.progress, text=f"{label}: {job.message}")
+        st.button("Cancel", key=f"cancel_{label}", on_click=job_manager.cancel, args=[key])
+        st.session_state['jobs_running'] = True
+        return None
+    if job.status == 'cancelling':
+        st.progress(job.progress, text=f"{label}: cancelling")
+        st.session_state['jobs_running'] = True
+        return None
+    if job.status == 'cancelled':
+        st.info(f"{label} was cancelled")
+        st.button("Run again", key=f"restart_{label}", on_click=job_manager.forget, args=[key])
+        return None
+    if job.status == 'failed':
+        st.error(f"{label} failed: {job.error}")
+        st.button("Run again", key=f"restart_{label}", on_click=job_manager.forget, args=[key])
+        return None
+    if job.claim_timing():
+        record_job(f"job: {label}", job.seconds, job.memory_delta_bytes)
+    return job.result
+
+
+def refresh_while_jobs_run():
+    if st.session_state.pop('jobs_running', False):
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+
+@instrumented
+def export_button(label, df, version, key, columns=None, formats=None):
+    # The file is written in chunks and reused for the same version, instead of hashing the frame on every run.
+    formats = formats or list(EXPORT_FORMATS)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        export_format = st.selectbox("Format", formats, key=f"{key}_format")
+    with col2:
+        compression = st.selectbox("Compression", EXPORT_FORMATS[export_format], key=f"{key}_compression",
+                                   format_func=lambda value: value or "none")
+    with col3:
+        filename = st.text_input("File name", "data", key=f"{key}_filename")
+    if st.button(label, key=key):
+        try:
+            path = export_dataset(df, version, export_format, compression, columns)
+        except (ValueError, TypeError) as error:
+            # Arrow refuses columns that mix value types (ArrowInvalid and ArrowTypeError derive from these).
+            st.error(f"Could not write {export_format}: {error}")
+            return
+        with open(path, 'rb') as file:
+            st.download_button(label=f"Click to download {export_format} file", data=file,
+                               file_name=f"{filename}.{file_extension(export_format, compression)}",
+                               mime=MIME_TYPES[export_format], key=f"{key}_download")
+
+
+@instrumented
+def data_preview(df, version, key):
+    # Only the visible window is sent to the browser; sorting and filtering run on the server.
+    col1, col2, col3, col4 = st.columns([0.3, 0.15, 0.3, 0.25])
+    with col1:
+        sort_by = st.selectbox("Sort by", df.columns, index=None, placeholder="No sorting", key=f"{key}_sort")
+    with col2:
+        ascending = st.radio("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Ascending"
+    with col3:
+        filter_column = st.selectbox("Filter column", df.columns, index=None, placeholder="No filter",
+                                     key=f"{key}_filter_column")
+    with col4:
+        query = st.text_input("Filter", placeholder="text, or > 5 for numbers and dates", key=f"{key}_query",
+                              disabled=filter_column is None)
+
+    col1, col2 = st.columns([0.2, 0.8])
+    with col1:
+        size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                            key=f"{key}_size")
+    _, total = preview_window(df, 0, 0, version, sort_by, ascending, filter_column, query)
+    pages = max(1, -(-total // size))
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    page = min(page, pages)
+
+    window, total = preview_window(df, (page - 1) * size, size, version, sort_by, ascending, filter_column, query)
+    st.dataframe(window, use_container_width=True)
+    first = (page - 1) * size + 1 if total else 0
+    st.caption(f"Rows {first}-{(page - 1) * size + len(window)} of {total}"
+               + (f" matching the filter ({len(df)} in the dataset)" if total != len(df) else ""))
+
+
+@contextmanager
+def instrumented_rerun(page):
+    # Messages queued for the browser are counted, which gives the payload size of each section.
+    profile = st.session_state.pop('profile_next_rerun', False)
+    ctx = get_script_run_ctx()
+    with record_rerun(page, profile) as record:
+        if ctx is None:
+            yield record
+            return
+        enqueue = ctx._enqueue
+
+        def counting_enqueue(msg):
+            record.count_payload(msg.ByteSize())
+            enqueue(msg)
+
+        ctx._enqueue = counting_enqueue
+        try:
+            yield record
+        finally:
+            ctx._enqueue = enqueue
+            st.session_state['last_rerun'] = record
+
+
+def request_profile():
+    st.session_state['profile_next_rerun'] = True
+
+
+def show_performance_panel():
+    side_bar = st.sidebar
+    if not side_bar.checkbox("Show performance panel", key='show_performance'):
+        return
+    record = st.session_state.get('last_rerun')
+    side_bar.button("Profile next rerun", on_click=request_profile)
+    if record is None:
+        return
+    sections = pd.DataFrame(record.sections)
+    side_bar.dataframe(pd.DataFrame({
+        'Section': ['  ' * depth + name for depth, name in zip(sections['depth'], sections['name'])],
+        'Time (ms)': sections['seconds'] * 1000,
+        'Memory (MB)': sections['memory_delta_bytes'] / 2 ** 20,
+        'Payload (KB)': sections['payload_bytes'] / 2 ** 10,
+    }), hide_index=True, use_container_width=True)
+    if record.profile is not None:
+        with side_bar.expander("Profile of the last rerun"):
+            st.code(record.profile)
+
+
+def load_page(module, function):
+    # Pages are imported on first dispatch; import_module waits if the warm-up thread is importing the same one.
+    cold = module not in sys.modules
+    with measure(f"import {module}") if cold else nullcontext():
+        page = importlib.import_module(module)
+    return getattr(page, function)
+
+
+def preload(modules):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            # A page that fails to import reports the error when it is dispatched.
+            pass
+
+
+def warm_up(modules):
+    # Once per process, after the first page is rendered, the other pages and their libraries are imported
+    # on a background thread so that switching to them later does not pay for the import.
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=preload, args=(list(modules),), name='page-warm-up', daemon=True).start()